@@ -0,0 +1,171 @@
+"""Solve every saved matrix in a folder or glob across a process pool, without the menus.
+
+    python batch.py saves/ --max-slope 0.03 --format csv --output results.csv
+
+Each job's results are written out as soon as that job finishes.
+"""
+import csv
+import glob
+import json
+import os
+import sys
+
+import core
+import matrix_io
+import solver
+
+DEFAULT_MAX_SLOPE = core.DEFAULT_MAX_SLOPE
+MATRIX_EXTENSIONS = (".mf", ".mfb")
+
+_result_caches = {}  # per worker process, by cache folder
+
+
+def find_jobs(sources):
+    # Expands folders (their .mf/.mfb files) and glob patterns into a sorted, de-duplicated list.
+    jobs = set()
+    for source in sources:
+        if os.path.isdir(source):
+            jobs.update(os.path.join(source, name) for name in os.listdir(source)
+                        if name.endswith(MATRIX_EXTENSIONS))
+        else:
+            jobs.update(path for path in glob.glob(source) if path.endswith(MATRIX_EXTENSIONS))
+    return sorted(jobs)
+
+
+def load_graph(path):
+    if path.endswith(".mfb"):
+        return matrix_io.load_mfb(path)
+    return matrix_io.read_mf_graph(path)
+
+
+def load_and_solve(path, max_slope, stats, engine="auto"):
+    with stats.phase("load"):
+        graph = load_graph(path)
+    return solver.solve_graph(graph, max_slope, engine, stats)
+
+
+def solve_job(path, max_slope, profile=False, cache_dir=None, engine="auto"):
+    # Runs in a worker process; returns a plain dict so it pickles cheaply.
+    stats = solver.SolveStats()
+    report = None
+    if cache_dir:
+        import cache
+        result_cache = _result_caches.setdefault(cache_dir, cache.ResultCache(directory=cache_dir))
+        try:
+            key = cache.file_key(path, max_slope, arithmetic="fixed" if engine == "fixed" else "float")
+        except OSError as e:
+            return {"job": path, "error": str(e)}
+        cached = result_cache.get(key)
+        if cached is not None:
+            stats.engine = "cache"
+            return dict(cached, job=path, stats=stats.as_dict())
+    try:
+        if profile:
+            graph, report = solver.profile_call(load_and_solve, path, max_slope, stats, engine)
+        else:
+            graph = load_and_solve(path, max_slope, stats, engine)
+    except Exception as e:
+        return {"job": path, "error": str(e)}
+    thicknesses = {label: (None if thickness != thickness else thickness)
+                   for label, thickness in zip(graph.labels, graph.thicknesses)}
+    solved = [thickness for thickness in thicknesses.values() if thickness is not None]
+    result = {"job": path, "max_thickness": max(solved) if solved else None, "thicknesses": thicknesses,
+              "stats": stats.as_dict()}
+    if cache_dir:
+        result_cache.put(key, {name: result[name] for name in ("max_thickness", "thicknesses")})
+    if report is not None:
+        result["profile"] = report
+    return result
+
+
+class CsvWriter:
+    # One row per point, then a "max" row per job; failed jobs get a single "error" row.
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.writer(stream)
+        self.writer.writerow(["job", "record", "point", "target_thickness", "error"])
+
+    def write(self, result):
+        job = result["job"]
+        if "error" in result:
+            self.writer.writerow([job, "error", "", "", result["error"]])
+        else:
+            for label, thickness in result["thicknesses"].items():
+                self.writer.writerow([job, "point", label, "X" if thickness is None else thickness, ""])
+            max_thickness = result["max_thickness"]
+            self.writer.writerow([job, "max", "", "X" if max_thickness is None else max_thickness, ""])
+        self.stream.flush()
+
+
+class JsonLinesWriter:
+    # One JSON object per job and line, so partial output stays readable.
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, result):
+        result = {key: value for key, value in result.items() if key != "profile"}
+        self.stream.write(json.dumps(result) + "\n")
+        self.stream.flush()
+
+
+WRITERS = {"csv": CsvWriter, "json": JsonLinesWriter}
+
+
+def run_batch(jobs, max_slope, writer, workers=None, profile=False, cache_dir=None, engine="auto", log_file=None,
+              log_level="INFO"):
+    # Returns the number of jobs that failed. With profile, each job's solver counters and
+    # cProfile report go to standard error. With log_file, each worker appends its solves'
+    # INFO records to that file; this process never logs, so it has no thread to fork.
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    initializer, initargs = None, ()
+    if log_file:
+        import diagnostics
+        initializer, initargs = diagnostics.configure_worker_logging, (log_file, log_level)
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        futures = [pool.submit(solve_job, job, max_slope, profile, cache_dir, engine) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            failures += "error" in result
+            writer.write(result)
+            if profile and "profile" in result:
+                print(f"== {result['job']}: {json.dumps(result['stats'])}\n{result['profile']}", file=sys.stderr)
+    return failures
+
+
+def main(argv=None):
+    import argparse  # only the command line needs it, not worker processes
+    parser = argparse.ArgumentParser(description="Solve saved matrices in bulk and write per-point thicknesses.")
+    parser.add_argument("sources", nargs="+", help="folders and/or glob patterns of .mf/.mfb files")
+    parser.add_argument("--max-slope", type=float, default=DEFAULT_MAX_SLOPE,
+                        help=f"max slope in height unit per distance unit (default: {DEFAULT_MAX_SLOPE})")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--output", help="file to write results to (default: standard output)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--profile", action="store_true",
+                        help="print solver counters and a cProfile report per job to standard error")
+    parser.add_argument("--engine", choices=["auto", "python", "numpy", "fixed"], default="auto",
+                        help="solver engine; fixed uses exact integer micro-units (default: auto)")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="reuse results for unchanged files and settings from this folder")
+    parser.add_argument("--log", metavar="FILE", help="append solve records to this log file (default: no log)")
+    parser.add_argument("--log-level", default="INFO", help="e.g. DEBUG, INFO, WARNING")
+    args = parser.parse_args(argv)
+
+    jobs = find_jobs(args.sources)
+    if not jobs:
+        print("No .mf or .mfb files found.", file=sys.stderr)
+        return 1
+    stream = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        failures = run_batch(jobs, args.max_slope, WRITERS[args.format](stream), args.workers, args.profile,
+                             args.cache, args.engine, args.log, args.log_level)
+    finally:
+        if args.output:
+            stream.close()
+    print(f"Solved {len(jobs) - failures} of {len(jobs)} matrices.", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
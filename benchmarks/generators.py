@@ -0,0 +1,82 @@
+"""Synthetic survey generators for the benchmarks.
+
+Each generator returns (heights, distances, coordinates): {label: height},
+[(point1, point2, distance)] and {label: (x, y)}. Heights are in millimeters and
+distances in inches, like the calculator's default settings.
+"""
+import math
+import random
+
+import spatial
+
+SPACING = 12.0  # inches between neighbouring survey points
+
+
+def _labels(count):
+    return [f"P{i}" for i in range(count)]
+
+
+def grid_floor(count, seed=0):
+    # Regular grid with 4-neighbour distances; heights drift like a real slab.
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(count - 1) + 1)
+    labels = _labels(count)
+    heights, coordinates = {}, {}
+    for i, label in enumerate(labels):
+        row, column = divmod(i, side)
+        coordinates[label] = (column * SPACING, row * SPACING)
+        heights[label] = round(20 + 5 * math.sin(row / 7) + 5 * math.cos(column / 9) + rng.uniform(-2, 2), 1)
+    distances = []
+    for i, label in enumerate(labels):
+        row, column = divmod(i, side)
+        if column + 1 < side and i + 1 < count:
+            distances.append((label, labels[i + 1], SPACING))
+        if i + side < count:
+            distances.append((label, labels[i + side], SPACING))
+    return heights, distances, coordinates
+
+
+def random_geometric(count, seed=0, degree=6.0):
+    # Uniformly scattered points joined to everything within a radius giving ~degree neighbours.
+    rng = random.Random(seed)
+    labels = _labels(count)
+    side = SPACING * math.sqrt(count)
+    coordinates = {label: (rng.uniform(0, side), rng.uniform(0, side)) for label in labels}
+    heights = {label: round(rng.uniform(0, 40), 1) for label in labels}
+    radius = SPACING * math.sqrt(degree / math.pi)
+    distances = [(point1, point2, round(distance, 2))
+                 for point1, point2, distance in spatial.radius_edges(coordinates, radius)]
+    return heights, distances, coordinates
+
+
+def long_chain(count, seed=0):
+    # A single line falling away from one high end: the worst case for a sweep-until-stable loop.
+    rng = random.Random(seed)
+    labels = _labels(count)
+    heights = {label: round(count * 0.5 - i * 0.5 + rng.uniform(0, 0.2), 2) for i, label in enumerate(labels)}
+    coordinates = {label: (i * SPACING, 0.0) for i, label in enumerate(labels)}
+    distances = [(labels[i], labels[i + 1], SPACING) for i in range(count - 1)]
+    return heights, distances, coordinates
+
+
+def dense(count, seed=0):
+    # Every pair of points measured, like a hand-built all-pairs matrix.
+    rng = random.Random(seed)
+    labels = _labels(count)
+    side = SPACING * math.sqrt(count)
+    coordinates = {label: (rng.uniform(0, side), rng.uniform(0, side)) for label in labels}
+    heights = {label: round(rng.uniform(0, 40), 1) for label in labels}
+    distances = [(labels[i], labels[j], round(math.dist(coordinates[labels[i]], coordinates[labels[j]]), 2))
+                 for i in range(count) for j in range(i + 1, count)]
+    return heights, distances, coordinates
+
+
+GENERATORS = {
+    "grid": grid_floor,
+    "geometric": random_geometric,
+    "chain": long_chain,
+    "dense": dense,
+}
+
+# All-pairs matrices grow quadratically; larger sizes are skipped for this generator
+MAX_POINTS = {"dense": 3000}
@@ -0,0 +1,65 @@
+"""Check that the modules short-lived workers and tools import stay within a start-up budget.
+
+    python benchmarks/import_time.py --budget-ms 30
+
+Each module is imported in a fresh interpreter (so nothing is cached in sys.modules) and
+the median import time is compared with the budget. One untimed import first makes sure
+the bytecode caches are written, so compiling sources is not counted. Exits with status 1 if any module is
+over it; --details prints python -X importtime output for those.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["core", "matrix_io", "solver", "csr", "batch"]
+DEFAULT_BUDGET_MS = 30.0
+MEASURE = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def import_seconds(module):
+    output = subprocess.run([sys.executable, "-c", MEASURE.format(module=module)], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output)
+
+
+def import_details(module, limit=15):
+    # The slowest entries of python -X importtime, by cumulative microseconds.
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import times against a budget.")
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=7, help="fresh interpreters per module; the median is reported")
+    parser.add_argument("--details", action="store_true", help="show the slowest imports of modules over budget")
+    args = parser.parse_args(argv)
+
+    over = []
+    for module in args.modules:
+        import_seconds(module)
+        milliseconds = 1000 * statistics.median(import_seconds(module) for _ in range(args.repeat))
+        status = "ok" if milliseconds <= args.budget_ms else "OVER BUDGET"
+        print(f"{module:<12} {milliseconds:8.2f} ms  {status}")
+        if milliseconds > args.budget_ms:
+            over.append(module)
+    for module in over if args.details else ():
+        print(f"\nslowest imports for {module} (cumulative microseconds):")
+        for microseconds, name in import_details(module):
+            print(f"{microseconds:>10} {name}")
+    print(f"\n{len(args.modules) - len(over)} of {len(args.modules)} modules within {args.budget_ms:g} ms")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
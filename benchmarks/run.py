@@ -0,0 +1,184 @@
+"""Benchmark the solver engines, matrix file I/O and the matrix view on synthetic floors.
+
+    python benchmarks/run.py --sizes 100 1000 10000 100000 --output results.json
+    python benchmarks/run.py --compare results.json
+
+Results are written as JSON so runs can be compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csr  # noqa: E402
+import matrix_io  # noqa: E402
+import solver  # noqa: E402
+from generators import GENERATORS, MAX_POINTS  # noqa: E402
+
+MAX_SLOPE = 0.044
+
+
+def legacy_sweep(heights, adjacency, max_slope):
+    # The original calculate_leveling_marker_heights loop, kept as a baseline.
+    thickness = {}
+    sorted_labels = sorted(heights, key=heights.get, reverse=True)
+    while True:
+        no_change = True
+        for label in sorted_labels:
+            for neighbor, distance in adjacency[label].items():
+                current = thickness.setdefault(neighbor, 0.0)
+                target_thickness = round(heights[label] - (distance * max_slope) - heights[neighbor], 2)
+                if target_thickness > current:
+                    thickness[neighbor] = target_thickness
+                    no_change = False
+        if no_change:
+            return thickness
+
+
+def best_time(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - start)
+    return min(runs), runs
+
+
+def write_mf(path, heights, distances, coordinates):
+    with open(path, "w") as f:
+        for label, height in heights.items():
+            x, y = coordinates[label]
+            f.write(f"{label} {height} {x} {y}\n")
+        for point1, point2, distance in distances:
+            f.write(f"{point1} {point2} {distance}\n")
+
+
+def import_calculator():
+    # The interactive calculator is needed for load_matrix/save_matrix/print_matrix timings.
+    try:
+        import index
+    except ImportError as e:
+        return None, f"calculator not importable here: {e}"
+    return index, None
+
+
+def benchmark_case(name, count, repeat, selected, workdir):
+    heights, distances, coordinates = GENERATORS[name](count)
+    adjacency = solver.build_adjacency(heights, distances)
+    graph = csr.CSRGraph.from_edges(heights, distances, coordinates)
+    mf_path = os.path.join(workdir, f"{name}-{count}.mf")
+    mfb_path = os.path.join(workdir, f"{name}-{count}.mfb")
+    write_mf(mf_path, heights, distances, coordinates)
+    matrix_io.save_mfb(mfb_path, graph)
+
+    cases = {
+        "legacy_sweep": lambda: legacy_sweep(heights, adjacency, MAX_SLOPE),
+        "solve": lambda: solver.propagate(heights, adjacency, MAX_SLOPE),
+        "solve_csr": lambda: solver.propagate_csr(graph, MAX_SLOPE),
+        "solve_fixed": lambda: solver.propagate_fixed(graph, MAX_SLOPE),
+        "load_mf_graph": lambda: matrix_io.read_mf_graph(mf_path),
+        "save_mf_graph": lambda: matrix_io.save_csr_mf(mf_path + ".out", graph),
+        "save_mfb": lambda: matrix_io.save_mfb(mfb_path + ".out", graph),
+        "load_mfb": lambda: matrix_io.load_mfb(mfb_path),
+    }
+    skipped = {}
+    if solver.numpy_available():
+        cases["solve_numpy"] = lambda: solver.propagate_numpy(graph, MAX_SLOPE)
+    else:
+        skipped["solve_numpy"] = "numpy is not installed"
+
+    calculator, reason = import_calculator()
+    if calculator is None:
+        for benchmark in ("load_matrix", "save_matrix", "print_matrix"):
+            skipped[benchmark] = reason
+    else:
+        matrix = matrix_io.load_mf(mf_path, calculator.Point)
+        cases["load_matrix"] = lambda: matrix_io.load_mf(mf_path, calculator.Point)
+        cases["save_matrix"] = lambda: matrix_io.save_mf(mf_path + ".out", matrix)
+        cases["print_matrix"] = lambda: render_quietly(calculator, matrix)
+
+    base = {"generator": name, "points": count, "edges": len(graph.neighbors) // 2}
+    for benchmark, function in cases.items():
+        if selected and benchmark not in selected:
+            continue
+        seconds, runs = best_time(function, repeat)
+        yield dict(base, benchmark=benchmark, seconds=seconds, runs=runs)
+    for benchmark, why in skipped.items():
+        if not selected or benchmark in selected:
+            yield dict(base, benchmark=benchmark, skipped=why)
+
+
+def render_quietly(calculator, matrix):
+    previous = dict(calculator.matrix)
+    calculator.matrix.clear()
+    calculator.matrix.update(matrix)
+    calculator.view.invalidate()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            calculator.print_matrix(False)
+    finally:
+        calculator.matrix.clear()
+        calculator.matrix.update(previous)
+        calculator.view.invalidate()
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = {(r["generator"], r["points"], r["benchmark"]): r["seconds"]
+                    for r in json.load(f)["results"] if "seconds" in r}
+    print(f"\n{'generator':<10} {'points':>8} {'benchmark':<14} {'baseline':>10} {'current':>10} {'speedup':>8}")
+    for r in results:
+        key = (r["generator"], r["points"], r["benchmark"])
+        if key in baseline and "seconds" in r:
+            print(f"{key[0]:<10} {key[1]:>8} {key[2]:<14} {baseline[key]:>10.4f} {r['seconds']:>10.4f} "
+                  f"{baseline[key] / r['seconds'] if r['seconds'] else float('inf'):>7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the leveling calculator on synthetic floors.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="point counts to generate (up to 1000000)")
+    parser.add_argument("--generators", nargs="+", choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument("--benchmarks", nargs="+", help="only run these benchmarks (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the best is reported")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.generators:
+            for count in args.sizes:
+                if count > MAX_POINTS.get(name, count):
+                    print(f"{name:<10} {count:>8} skipped (above {MAX_POINTS[name]} points)")
+                    continue
+                for result in benchmark_case(name, count, args.repeat, args.benchmarks, workdir):
+                    results.append(result)
+                    timing = f"{result['seconds']:.4f}s" if "seconds" in result else f"skipped: {result['skipped']}"
+                    print(f"{name:<10} {count:>8} {result['benchmark']:<14} {timing}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": solver.numpy_available(),
+        "max_slope": MAX_SLOPE,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Content-addressed cache of solve results.
+
+Keys are SHA-256 digests of everything a result depends on (the saved matrix file's bytes,
+max_slope, units and float or fixed-point arithmetic), so any change to the inputs simply
+produces a different key. Results live in an in-memory LRU and, optionally, as JSON files
+in a size-capped folder.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+KEY_VERSION = 1  # bump when the solver's output for the same inputs changes
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+# Below this many points a full solve takes well under 0.1 s, so callers solve directly
+# instead of keeping a cache file per small job.
+MIN_CACHED_POINTS = 10_000
+
+
+def file_digest(path):
+    # SHA-256 of a saved matrix file's bytes.
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_key(path, max_slope, height_unit="", distance_unit="", arithmetic="float", digest=None):
+    # Key for solving a saved matrix file with these settings. Pass the file_digest() taken
+    # when the file was loaded to key exactly what was loaded, even if the file changed since.
+    if digest is None:
+        digest = file_digest(path)
+    return hashlib.sha256(f"file {KEY_VERSION}|{float(max_slope)!r}|{height_unit}|{distance_unit}|{arithmetic}|"
+                          f"{digest}".encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk_bytes = None  # measured on first disk write
+        self.hits = self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+        if self.directory:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    value = json.load(f)
+                os.utime(path)  # eviction removes the least recently used files first
+            except (OSError, ValueError):
+                pass
+            else:
+                self._remember(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.directory:
+            self._write(key, value)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _write(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(value, f)
+        os.replace(temporary, path)
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+        else:
+            self._disk_bytes += os.path.getsize(path)
+        if self._disk_bytes > self.max_disk_bytes:
+            self._evict()
+
+    def _disk_entries(self):
+        for folder, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(folder, name)
+                    try:
+                        status = os.stat(path)
+                    except OSError:
+                        continue  # removed by another process
+                    yield path, status.st_size, status.st_mtime
+
+    def _evict(self):
+        # Oldest files go first until the folder is back under 90% of its cap.
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._disk_bytes = total
+
+    def clear(self):
+        self._memory.clear()
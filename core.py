@@ -0,0 +1,117 @@
+"""The calculator's data model, importable without the interactive menus.
+
+A matrix is a {label: Point} dict. Every distance is stored on both of its points, so a
+point's distances double as the reverse index of who refers to it: set_distance,
+remove_distance and remove_point(s) keep both sides in step and cost O(degree).
+load_matrix/save_matrix read and write saved files and solve() fills in each point's
+target thickness. Nothing here imports logging, datetime or
+console input, so batch workers and command-line tools start quickly; index.py is the
+interactive front-end on top of this module.
+"""
+import matrix_io
+import solver
+
+# this values, .044mm/inch, was based on sources I found that said 3/16 over 10 feet or 1/8 over 6 feet- .044mm/inch is about right between those
+DEFAULT_MAX_SLOPE = 0.044
+
+
+class Distance:
+    def __init__(self, point1, point2, distance: float):
+        self.point1 = point1
+        self.point2 = point2
+        try:
+            self.distance = float(distance)
+        except ValueError:
+            raise ValueError("Distance must be a float")
+
+    def __str__(self):
+        return f"{self.point1}-{self.point2}: {self.distance}"
+
+
+class Point:
+    def __init__(self, label, height: float, x: float = None, y: float = None):
+        self.label = label
+        self.height = height
+        self.x = x
+        self.y = y
+        self.distances = {}
+        self.target_thickness = 'X'
+
+    @property
+    def has_coordinates(self):
+        return self.x is not None and self.y is not None
+
+    def add_reference(self, point, distance: float):
+        # keeps the first distance entered, as files are loaded; set_reference changes it
+        if point not in self.distances:
+            self.distances[point] = Distance(self.label, point, distance)
+
+    def set_reference(self, point, distance: float):
+        self.distances[point] = Distance(self.label, point, distance)
+
+    def remove_reference(self, point):
+        return self.distances.pop(point, None)
+
+    def __str__(self):
+        return f"{self.label}: {self.height}"
+
+
+def set_distance(matrix, point1, point2, distance):
+    # Adds the distance between two points or changes it, on both points; returns the
+    # previous distance, or None if there was none.
+    for label in (point1, point2):
+        if label not in matrix:
+            raise ValueError(f"Distance {point1}-{point2} references unknown point {label}")
+    if point1 == point2:
+        raise ValueError(f"Distance {point1}-{point2} must join two different points")
+    previous = matrix[point1].distances.get(point2)
+    matrix[point1].set_reference(point2, distance)
+    matrix[point2].set_reference(point1, distance)
+    return None if previous is None else previous.distance
+
+
+def remove_distance(matrix, point1, point2):
+    # True if there was a distance to remove.
+    removed = point1 in matrix and matrix[point1].remove_reference(point2) is not None
+    if point2 in matrix:
+        removed = matrix[point2].remove_reference(point1) is not None or removed
+    return removed
+
+
+def remove_point(matrix, label):
+    # Removes a point and the references its neighbours hold to it; returns the point.
+    point = matrix.pop(label)
+    for neighbor in point.distances:
+        if neighbor in matrix:
+            matrix[neighbor].remove_reference(label)
+    return point
+
+
+def remove_points(matrix, labels):
+    # Bulk remove_point() for the labels that exist; references between two removed points
+    # are dropped with them rather than one at a time. Returns the removed labels.
+    removed = [label for label in dict.fromkeys(labels) if label in matrix]
+    gone = set(removed)
+    for label in removed:
+        point = matrix.pop(label)
+        for neighbor in point.distances:
+            if neighbor not in gone and neighbor in matrix:
+                matrix[neighbor].remove_reference(label)
+    return removed
+
+
+def load_matrix(path, progress=None):
+    # .mf, .mfb or .mfj, picked by extension
+    return matrix_io.load_matrix_file(path, Point, progress)
+
+
+def save_matrix(path, matrix):
+    matrix_io.save_mf(path, matrix)
+
+
+def solve(matrix, max_slope=DEFAULT_MAX_SLOPE, on_update=None, stats=None):
+    # Sets every point's target_thickness ('X' without distances) and returns {label: thickness}.
+    thicknesses = solver.solve_matrix(matrix, max_slope, on_update, stats)
+    for label, point in matrix.items():
+        point.target_thickness = thicknesses.get(label, 'X')
+    return thicknesses
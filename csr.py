@@ -0,0 +1,235 @@
+"""Array-backed (CSR) survey storage for large matrices.
+
+Labels are interned to integer ids. Heights and thicknesses live in flat double arrays
+and adjacency in compressed-sparse-row form: the neighbours of point i are
+neighbors[offsets[i]:offsets[i + 1]] with matching entries in distances.
+"""
+from array import array
+from collections.abc import Mapping
+
+NO_THICKNESS = float("nan")  # stored for points without distances; shown as 'X'
+NO_COORDINATE = float("nan")
+
+
+class CSRGraph:
+    def __init__(self, labels, heights, offsets, neighbors, distances, thicknesses=None, xs=None, ys=None):
+        self.labels = labels
+        self.heights = heights
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.distances = distances
+        if thicknesses is None:
+            thicknesses = array("d", [NO_THICKNESS]) * len(labels)
+        self.thicknesses = thicknesses
+        # optional plan coordinates, NaN where a point has none
+        self.xs = xs
+        self.ys = ys
+        self._index = None
+
+    @classmethod
+    def from_edges(cls, points, distances, coordinates=None):
+        # points: {label: height} or (label, height) pairs; distances: (point1, point2, distance);
+        # coordinates: optional {label: (x, y)}.
+        # Edges are stored both ways and the first distance entered wins, like Point.add_reference.
+        if isinstance(points, Mapping):
+            points = points.items()
+        labels = []
+        index = {}
+        heights = array("d")
+        for label, height in points:
+            if label in index:
+                heights[index[label]] = float(height)
+                continue
+            index[label] = len(labels)
+            labels.append(label)
+            heights.append(float(height))
+        edges = {}
+        for point1, point2, distance in distances:
+            try:
+                id1, id2 = index[point1], index[point2]
+            except KeyError as e:
+                raise ValueError(f"Distance {point1}-{point2} references unknown point {e.args[0]}") from None
+            if id1 != id2:
+                edges.setdefault((min(id1, id2), max(id1, id2)), float(distance))
+        degrees = array("q", [0]) * len(labels)
+        for id1, id2 in edges:
+            degrees[id1] += 1
+            degrees[id2] += 1
+        offsets = _prefix_sum(degrees)
+        cursor = array("q", offsets[:-1])
+        neighbors = array("q", [0]) * offsets[-1]
+        weights = array("d", [0.0]) * offsets[-1]
+        for (id1, id2), distance in edges.items():
+            for source, target in ((id1, id2), (id2, id1)):
+                slot = cursor[source]
+                neighbors[slot] = target
+                weights[slot] = distance
+                cursor[source] = slot + 1
+        graph = cls(labels, heights, offsets, neighbors, weights)
+        if coordinates:
+            graph.xs = array("d", [NO_COORDINATE]) * len(labels)
+            graph.ys = array("d", [NO_COORDINATE]) * len(labels)
+            for label, (x, y) in coordinates.items():
+                graph.xs[index[label]] = float(x)
+                graph.ys[index[label]] = float(y)
+        graph._index = index
+        return graph
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        # Builds from a {label: Point} dict, keeping each point's own distance entries.
+        labels = list(matrix)
+        index = {label: i for i, label in enumerate(labels)}
+        heights = array("d", (point.height for point in matrix.values()))
+        offsets = array("q", [0])
+        neighbors = array("q")
+        weights = array("d")
+        for point in matrix.values():
+            for neighbor, distance in point.distances.items():
+                neighbors.append(index[neighbor])
+                weights.append(distance.distance)
+            offsets.append(len(neighbors))
+        thicknesses = array("d", (NO_THICKNESS if point.target_thickness == 'X' else point.target_thickness
+                                  for point in matrix.values()))
+        graph = cls(labels, heights, offsets, neighbors, weights, thicknesses)
+        if any(getattr(point, "x", None) is not None for point in matrix.values()):
+            graph.xs = array("d", (NO_COORDINATE if point.x is None else point.x for point in matrix.values()))
+            graph.ys = array("d", (NO_COORDINATE if point.y is None else point.y for point in matrix.values()))
+        graph._index = index
+        return graph
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {label: i for i, label in enumerate(self.labels)}
+        return self._index
+
+    @property
+    def edge_count(self):
+        return len(self.neighbors) // 2
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.index
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __getitem__(self, label):
+        return PointView(self, self.index[label])
+
+    def keys(self):
+        return self.labels
+
+    def values(self):
+        return (PointView(self, i) for i in range(len(self.labels)))
+
+    def items(self):
+        return ((label, PointView(self, i)) for i, label in enumerate(self.labels))
+
+    def thickness_map(self):
+        # {label: thickness} for points with distances, the same shape solver.solve() returns.
+        return {label: thickness for label, thickness in zip(self.labels, self.thicknesses)
+                if thickness == thickness}
+
+
+def _prefix_sum(counts):
+    offsets = array("q", [0])
+    total = 0
+    for count in counts:
+        total += count
+        offsets.append(total)
+    return offsets
+
+
+def _coordinate(values, point_id):
+    if values is None:
+        return None
+    value = values[point_id]
+    return None if value != value else value
+
+
+class EdgeView:
+    __slots__ = ("point1", "point2", "distance")
+
+    def __init__(self, point1, point2, distance):
+        self.point1 = point1
+        self.point2 = point2
+        self.distance = distance
+
+    def __str__(self):
+        return f"{self.point1}-{self.point2}: {self.distance}"
+
+
+class DistancesView(Mapping):
+    # Read-only stand-in for Point.distances: {neighbor label: Distance-like}.
+    __slots__ = ("_graph", "_id")
+
+    def __init__(self, graph, point_id):
+        self._graph = graph
+        self._id = point_id
+
+    def _slots(self):
+        return range(self._graph.offsets[self._id], self._graph.offsets[self._id + 1])
+
+    def __len__(self):
+        return len(self._slots())
+
+    def __iter__(self):
+        graph = self._graph
+        return (graph.labels[graph.neighbors[slot]] for slot in self._slots())
+
+    def __getitem__(self, label):
+        graph = self._graph
+        target = graph.index[label]
+        for slot in self._slots():
+            if graph.neighbors[slot] == target:
+                return EdgeView(graph.labels[self._id], label, graph.distances[slot])
+        raise KeyError(label)
+
+
+class PointView:
+    # Thin Point-style view onto one row of a CSRGraph; no per-point objects are stored.
+    __slots__ = ("_graph", "_id")
+
+    def __init__(self, graph, point_id):
+        self._graph = graph
+        self._id = point_id
+
+    @property
+    def label(self):
+        return self._graph.labels[self._id]
+
+    @property
+    def height(self):
+        return self._graph.heights[self._id]
+
+    @height.setter
+    def height(self, value):
+        self._graph.heights[self._id] = float(value)
+
+    @property
+    def target_thickness(self):
+        thickness = self._graph.thicknesses[self._id]
+        return 'X' if thickness != thickness else thickness
+
+    @target_thickness.setter
+    def target_thickness(self, value):
+        self._graph.thicknesses[self._id] = NO_THICKNESS if value == 'X' else float(value)
+
+    @property
+    def x(self):
+        return _coordinate(self._graph.xs, self._id)
+
+    @property
+    def y(self):
+        return _coordinate(self._graph.ys, self._id)
+
+    @property
+    def distances(self):
+        return DistancesView(self._graph, self._id)
+
+    def __str__(self):
+        return f"{self.label}: {self.height}"
@@ -0,0 +1,99 @@
+"""Non-blocking log and trace output.
+
+configure_logging() routes every record through a queue; a background listener thread does
+the file writes, so logging calls only enqueue. TraceSink buffers solver progress lines and
+writes them in blocks, or drops them entirely when switched off.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FILE = "floor_level_calculator.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+DEFAULT_LOG_LEVEL = "INFO"
+
+_listener = None
+
+
+def parse_level(level):
+    # Accepts a level name ("debug", "INFO") or number; unknown names fall back to the default.
+    if isinstance(level, (int, float)):
+        return int(level)
+    value = logging.getLevelName(str(level).strip().upper())
+    return value if isinstance(value, int) else logging.getLevelName(DEFAULT_LOG_LEVEL)
+
+
+def configure_logging(filename=LOG_FILE, level=DEFAULT_LOG_LEVEL):
+    global _listener
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _listener.start()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(parse_level(level))
+
+
+def configure_worker_logging(filename=LOG_FILE, level=DEFAULT_LOG_LEVEL):
+    # For pool worker processes: they end with os._exit, which skips atexit and would lose
+    # whatever is still queued, so they write to the file directly.
+    logging.basicConfig(filename=filename, format=LOG_FORMAT, level=parse_level(level), force=True)
+
+
+def set_level(level):
+    logging.getLogger().setLevel(parse_level(level))
+
+
+def stop_logging():
+    # Drains the queue and joins the writer thread; safe to call more than once.
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class TraceSink:
+    def __init__(self, enabled=True, stream=None, buffer_lines=1000):
+        self.enabled = enabled
+        self.stream = stream
+        self.buffer_lines = buffer_lines
+        self._lines = []
+
+    def write(self, line):
+        if not self.enabled:
+            return
+        self._lines.append(line)
+        if len(self._lines) >= self.buffer_lines:
+            self.flush()
+
+    def thickness_update(self, label, target_thickness):
+        self.write(f"Point {label} target thickness updated to {target_thickness}")
+
+    @property
+    def on_update(self):
+        # Solver callback, or None when tracing is off so the solver skips the call entirely.
+        return self.thickness_update if self.enabled else None
+
+    def flush(self):
+        if self._lines:
+            stream = self.stream or sys.stdout
+            stream.write("\n".join(self._lines) + "\n")
+            stream.flush()
+            self._lines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
@@ -1,18 +1,26 @@
 import sys
 import os
 import logging
-import msvcrt
-from datetime import datetime
 
-# Configure logging
-logging.basicConfig(filename='floor_level_calculator.log', level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+import cache
+import core
+import diagnostics
+import matrix_io
+import matrix_view
+import raster
+import solver
+import spatial
+import volume
+from core import Point
 
 default_variables = {
     "height_unit": "millimeters",
     "distance_unit": "inch",
-    "max_slope": 0.044, # this values, .044mm/inch, was based on sources I found that said 3/16 over 10 feet or 1/8 over 6 feet- .044mm/inch is about right between those
+    "max_slope": core.DEFAULT_MAX_SLOPE,
     "save_folder": "saves",
+    "log_level": diagnostics.DEFAULT_LOG_LEVEL,
+    "solver_trace": "on",
+    "arithmetic": "float",
 }
 
 current_variables = default_variables.copy()
@@ -48,6 +56,7 @@ menu_options = {
         "5": "Settings",
         "6": "About",
         "7": "Help",
+        "8": "Open Reports Menu",
         "9": "Exit",
     },
     "matrix_menu": {
@@ -55,6 +64,7 @@ menu_options = {
         "1": "Input Points",
         "2": "Input Distances",
         "3": "Show Current Matrix",
+        "4": "Generate Distances From Coordinates",
         "5": "Delete Points",
         "9": "Back to Main Menu",
     },
@@ -64,11 +74,22 @@ menu_options = {
         "2": "Change Distance Unit",
         "3": "Change Max Slope",
         "4": "Change Save Folder",
+        "6": "Change Log Level",
+        "8": "Toggle Solver Trace",
+        "0": "Toggle Fixed-Point Arithmetic",
         #"5": "Save & Return to Main Menu",
         "7": "Restore default settings",
         #"9": "Exit Without Saving",
         "9": "Back to Main Menu",
     },
+    "reports_menu": {
+        "Title": "Reports Menu",
+        "1": "Estimate Compound Volume",
+        "2": "Compare Max Slopes",
+        "3": "Thickness At One Point",
+        "4": "Export Thickness Map",
+        "9": "Back to Main Menu",
+    },
     "about_menu": {
         "Title": "About",
         "10": "Author: Matthew Eater",
@@ -83,32 +104,15 @@ menu_options = {
 }
 
 matrix = {}
-
-class Distance:
-    def __init__(self, point1, point2, distance: float):
-        self.point1 = point1
-        self.point2 = point2
-        try:
-            self.distance = float(distance)
-        except ValueError:
-            raise ValueError("Distance must be a float")
-
-    def __str__(self):
-        return f"{self.point1}-{self.point2}: {self.distance}"
-
-class Point:
-    def __init__(self, label, height: float):
-        self.label = label
-        self.height = height
-        self.distances = {}
-        self.target_thickness = 'X'
-
-    def add_reference(self, point, distance: float):
-        if point not in self.distances:
-            self.distances[point] = Distance(self.label, point, distance)
-
-    def __str__(self):
-        return f"{self.label}: {self.height}"
+profile_solver = False  # set by the --profile command line flag
+solver_workers = 1  # --parallel: recompute large rooms of big surveys on every core
+result_cache = None
+journal = None  # matrix_io.MatrixJournal that edits are appended to, after saving or loading a .mfj
+last_load_seconds = None
+loaded_file = None  # (path, cache.file_digest, leveling.revision) of the last load, for the result cache
+# Mirrors matrix so "Calculate" only re-propagates what was edited since the last solve
+leveling = solver.IncrementalSolver(default_variables["max_slope"])
+view = matrix_view.MatrixView(matrix)
 
 # Menu Functions
 
@@ -131,6 +135,8 @@ def main_menu_choice(choice):
                 select_matrix_file()
             elif action == "Help":
                 main_help()
+            elif action == "Open Reports Menu":
+                print_menu("reports_menu", reports_menu_choice)
             elif action == "About":
                 print_menu("about_menu", lambda x: False)
                 #wait_for_input()
@@ -152,57 +158,183 @@ def calculate_leveling_marker_heights():
         print("You must have at least 2 points to calculate leveling marker heights.")
         wait_for_input()
         return
-    sorted_points = sorted(matrix.values(), key=lambda x: x.height, reverse=True)
-    no_change = False
-    while True:
-        no_change = True
-        for point in sorted_points:
-            if len(point.distances) == 0:
-                continue
-            for distance in point.distances.values():
-                adjacent_point = matrix[distance.point2]
-                if adjacent_point.target_thickness == 'X':
-                    adjacent_point.target_thickness = 0.0
-                target_height = point.height - (distance.distance * current_variables["max_slope"])
-                target_thickness = round(target_height - adjacent_point.height, 2)
-                if target_thickness > adjacent_point.target_thickness:
-                    adjacent_point.target_thickness = target_thickness
-                    no_change = False
-                    print(f"Point {adjacent_point.label} target thickness updated to {adjacent_point.target_thickness}")
-        if no_change:
-            break
-    print_matrix(False)
+    with diagnostics.TraceSink(enabled=current_variables["solver_trace"] == "on") as trace:
+        stats, profile_report = update_thicknesses(trace.on_update)
+    with stats.phase("render"):
+        print_matrix(False)
+    if profile_solver:
+        if last_load_seconds is not None:
+            stats.timings["load"] = last_load_seconds
+        print_and_dash("\nSolver Profile")
+        print(stats)
+        print(profile_report)
     wait_for_input()
-    
+
+def update_thicknesses(on_update=None):
+    stats = solver.SolveStats()
+    profile_report = None
+    leveling.max_slope = current_variables["max_slope"]
+    leveling.fixed_point = current_variables["arithmetic"] == "fixed"
+    cache_key = cached = None
+    if (loaded_file is not None and loaded_file[2] == leveling.revision and leveling.dirty
+            and len(leveling.heights) >= cache.MIN_CACHED_POINTS):
+        # a large job exactly as it was loaded, so the result may be cached under the file's digest
+        path, digest, _ = loaded_file
+        cache_key = cache.file_key(path, leveling.max_slope, current_variables["height_unit"],
+                                   current_variables["distance_unit"], current_variables["arithmetic"], digest)
+        cached = get_result_cache().get(cache_key)
+    if cached is not None:
+        changed = leveling.adopt(cached, on_update)
+        stats.engine = "cache"
+    elif profile_solver:
+        changed, profile_report = solver.profile_call(leveling.solve, on_update, stats, solver_workers)
+    else:
+        changed = leveling.solve(on_update, stats, solver_workers)
+    if cache_key is not None and cached is None:
+        get_result_cache().put(cache_key, dict(leveling.thicknesses))
+    for label, target_thickness in changed.items():
+        matrix[label].target_thickness = 'X' if target_thickness is None else target_thickness
+    return stats, profile_report
+
+def get_result_cache():
+    global result_cache
+    directory = os.path.join(current_variables["save_folder"], ".cache")
+    if result_cache is None or result_cache.directory != directory:
+        result_cache = cache.ResultCache(directory=directory)
+    return result_cache
+
+def estimate_compound_volume():
+    refresh_screen()
+    print_and_dash("Estimate Compound Volume")
+    located = sum(1 for point in matrix.values() if point.has_coordinates)
+    if located < 3:
+        print("You must have at least 3 points with x/y coordinates to estimate the compound volume.")
+        wait_for_input()
+        return
+    update_thicknesses()
+    compound, area, triangles = volume.matrix_volume(matrix)
+    height_unit = current_variables["height_unit"]
+    distance_unit = current_variables["distance_unit"]
+    print(f"Points with coordinates: {located} of {len(matrix)}")
+    print(f"Triangles: {triangles}")
+    print(f"Covered area: {area:.2f} {distance_unit}^2")
+    print(f"Compound volume: {compound:.2f} {height_unit}*{distance_unit}^2")
+    litres = volume.to_litres(compound, height_unit, distance_unit)
+    if litres is not None:
+        print(f"Compound volume: {litres:.2f} litres")
+    wait_for_input()
+
+def query_point_thickness():
+    refresh_screen()
+    print_and_dash("Thickness At One Point")
+    if not matrix:
+        print("No points in the matrix.")
+        wait_for_input()
+        return
+    point_label = validate_input("Enter point label (or press Enter to cancel): ", check_for_points, "Point not found.")
+    if not point_label:
+        return
+    leveling.max_slope = current_variables["max_slope"]
+    leveling.fixed_point = current_variables["arithmetic"] == "fixed"
+    target_thickness = leveling.thickness_at(point_label)
+    if target_thickness is None:
+        print(f"Point {point_label} has no distances, so it has no target thickness.")
+    else:
+        print(f"Target thickness at {point_label}: {target_thickness}{current_variables['height_unit']}")
+    wait_for_input()
+
+def export_thickness_map():
+    refresh_screen()
+    print_and_dash("Export Thickness Map")
+    if not any(point.has_coordinates for point in matrix.values()):
+        print("You must have points with x/y coordinates to export a thickness map.")
+        wait_for_input()
+        return
+    distance_unit = current_variables["distance_unit"]
+    resolution = validate_input(f"Enter pixel size in {distance_unit} (e.g. 0.01): ", lambda x: x.replace('.', '', 1).isdigit() and float(x) > 0, "Invalid pixel size. Please enter a number above 0.")
+    if not resolution:
+        return
+    print("The file extension picks the format: .ppm (colour image), .pgm (greyscale image) or .csv.")
+    default_file_name = "thickness_map.ppm"
+    file_name = input(f"Enter file name for the map (default: {default_file_name}): ").strip() or default_file_name
+    if not file_name.endswith(tuple(f".{fmt}" for fmt in raster.FORMATS)):
+        file_name += ".ppm"
+    save_folder = current_variables["save_folder"]
+    if not os.path.exists(save_folder):
+        os.makedirs(save_folder)
+    update_thicknesses()
+    xs, ys, thicknesses = volume.matrix_samples(matrix)
+    try:
+        grid = raster.export_raster(os.path.join(save_folder, file_name), xs, ys, thicknesses, float(resolution))
+    except (OSError, ValueError) as e:
+        logging.error(f"Error exporting thickness map: {e}")
+        print(f"Error: {e}")
+    else:
+        logging.info(f"Thickness map exported to {file_name}")
+        print(f"{grid.width}x{grid.height} map of {len(xs)} points saved to {os.path.join(save_folder, file_name)}")
+        if file_name.endswith(".ppm"):
+            print(f"Colours run from blue (no compound) to red ({max(thicknesses)}{current_variables['height_unit']}).")
+    wait_for_input()
+
 def save_matrix():
     save_folder = current_variables["save_folder"]
     if not os.path.exists(save_folder):
         os.makedirs(save_folder)
     # save the current matrix to a file
+    from datetime import datetime
     time_string = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    default_file_name = f"matrix_{time_string}.mf"
+    default_file_name = os.path.basename(journal.path) if journal is not None else f"matrix_{time_string}.mf"
+    print("Tip: a .mfj file name keeps a journal that every later edit is saved to as you make it.")
     file_name = input(f"Enter file name to save the matrix (default: {default_file_name}): ").strip()
     if file_name == "":
         file_name = default_file_name
-    if not file_name.endswith('.mf'):
+    if not file_name.endswith(('.mf', matrix_io.JOURNAL_EXTENSION)):
         file_name += '.mf'
     try:
-        with open(os.path.join(save_folder, file_name), 'w') as f:
-            for point in matrix.values():
-                f.write(f"{point.label} {point.height}\n")
-                for distance in point.distances.values():
-                    f.write(f"{distance.point1} {distance.point2} {distance.distance}\n")
-        print(f"Matrix saved to {save_folder}\{file_name}\n")
+        if file_name.endswith(matrix_io.JOURNAL_EXTENSION):
+            start_journal(os.path.join(save_folder, file_name))
+            print(f"Matrix saved to {os.path.join(save_folder, file_name)}; further edits are saved as you make them.\n")
+        else:
+            matrix_io.save_mf(os.path.join(save_folder, file_name), matrix)
+            print(f"Matrix saved to {os.path.join(save_folder, file_name)}\n")
     except Exception as e:
         logging.error(f"Error saving matrix: {e}")
         print(f"Error saving matrix: {e}")
     wait_for_input()
 
+def start_journal(path):
+    # Writes a snapshot to path (compacting it if it is the open journal) and journals edits there from now on.
+    global journal
+    if journal is not None and journal.path != path:
+        close_journal()
+    if journal is None:
+        journal = matrix_io.MatrixJournal(path)
+    journal.compact(matrix)
+    logging.info(f"Journaling edits to {path}")
+
+def close_journal():
+    global journal
+    if journal is not None:
+        journal.close()
+        journal = None
+
+def journal_edit(record):
+    # Appends one edit to the open journal, if any, and compacts it once its tail outgrows the snapshot.
+    if journal is None:
+        return
+    try:
+        journal.append(record)
+        if journal.should_compact():
+            journal.compact(matrix)
+    except OSError as e:
+        logging.error(f"Error writing journal {journal.path}: {e}")
+        print(f"Error writing journal {journal.path}: {e}")
+
 def select_matrix_file():
     save_folder = current_variables["save_folder"]
     if not os.path.exists(save_folder):
         os.makedirs(save_folder)
-    files = [f for f in os.listdir(save_folder) if f.endswith('.mf')]
+    files = [f for f in os.listdir(save_folder) if f.endswith(('.mf', '.mfb', matrix_io.JOURNAL_EXTENSION))]
     if not files:
         print("No saved matrices found.")
         wait_for_input()
@@ -237,44 +369,50 @@ def prompt_for_save_choice(backup_folders, refresh: bool = False):
         return prompt_for_save_choice(backup_folders)    
 
 def load_matrix(file):
-    # load the matrix from a file
-    points_buffer = {}
-    distances_buffer = []
+    global last_load_seconds, journal, loaded_file
+    # load the matrix from a file; the current matrix is only replaced once the file has loaded
     try:
-        with open(file, 'r') as f:
-            for line in f:
-                parts = line.strip().split()
-                if len(parts) == 2:
-                    label, height = parts
-                    points_buffer[label] = float(height)
-                elif len(parts) == 3:
-                    point1, point2, distance = parts
-                    distances_buffer.append((point1, point2, float(distance)))
-        for label, height in points_buffer.items():
-            matrix[label] = Point(label, height)
-        
-        for point1, point2, distance in distances_buffer:
-            matrix[point1].add_reference(point2, distance)
-            matrix[point2].add_reference(point1, distance)
-        
+        load_stats = solver.SolveStats()
+        with load_stats.phase("load"):
+            if file.endswith(matrix_io.JOURNAL_EXTENSION):
+                opened, loaded = matrix_io.MatrixJournal.open(file, Point, progress=print_load_progress)
+            else:
+                opened, loaded = None, matrix_io.load_matrix_file(file, Point, progress=print_load_progress)
+            print()
+            close_journal()
+            journal = opened
+            matrix.clear()
+            matrix.update(loaded)
+            view.invalidate()
+            leveling.load_matrix(matrix)
+            loaded_file = None
+            if len(matrix) >= cache.MIN_CACHED_POINTS:
+                loaded_file = (file, cache.file_digest(file), leveling.revision)
+        last_load_seconds = load_stats.timings["load"]
         print(f"Matrix loaded from {file}")
-        logging.info(f"Matrix loaded successfully from {file}")
+        logging.info(f"Matrix loaded successfully from {file} in {last_load_seconds:.3f}s")
     except Exception as e:
+        print()
         logging.error(f"Error loading matrix: {e}")
         print(f"Error loading matrix: {e}")
     print_matrix(False)
     wait_for_input()
 
+def print_load_progress(bytes_read, total_bytes):
+    percent = 100 * bytes_read // total_bytes if total_bytes else 100
+    print(f"\rLoading... {percent}%", end="", flush=True)
+
 def main_help():
     refresh_screen()
     print_and_dash("\nLevel Calculator Help")
     print("Open Matrix Menu: Access the matrix input and management menu.")
     print("Calculate Floor Leveling Details: Calculate the leveling marker heights based on the current matrix.")
-    print("Save Current Matrix: Save the current matrix to a file.")
-    print("Load Saved Matrix: Load a saved matrix from a file.")
+    print("Save Current Matrix: Save the current matrix to a file. Saving to a .mfj journal also saves every later edit as it is made.")
+    print("Load Saved Matrix: Load a saved matrix from a file (.mf text, .mfb binary or .mfj journal).")
     print("Settings: Change application settings.")
     print("About: Information about the application and its author.")
     print("Help: Display this help message (also works in the matrix menu and settings menu).")
+    print("Open Reports Menu: Compound volume and max slope comparisons for the current matrix.")
     print("Exit: Exit the application.")
     wait_for_input()
 
@@ -284,22 +422,25 @@ def delete_points():
     while True:
         refresh_screen()
         print_and_dash("Delete Points")
-        print("Enter the point label to delete, then hit enter.")
+        print("Enter the point label to delete, then hit enter. Several labels separated by spaces delete them all.")
         print_and_dash("Hit enter without entering a point to finish deleting points.")
         print_matrix(False)
-        point_label = input("Enter point label to delete (or press Enter to finish): ").strip()
-        if point_label == "":
+        entered = input("Enter point label(s) to delete (or press Enter to finish): ").strip()
+        # a label that exists as typed wins, so labels containing spaces can still be deleted
+        point_labels = [entered] if entered in matrix else entered.split()
+        if not point_labels:
             if confirm_escape():
                 break
-        if point_label in matrix:
-            del matrix[point_label]
-            distances = {k: v for k, v in distances.items() if point_label not in k}
-            for k in list(distances.keys()):
-                if point_label in k:
-                    del distances[k]
-            print(f"Point {point_label} deleted.")
-        else:
-            print(f"Point {point_label} not found.")
+            continue
+        deleted = core.remove_points(matrix, point_labels)
+        for point_label in deleted:
+            leveling.remove_point(point_label)
+            journal_edit(("delete_point", point_label))
+        if deleted:
+            print(f"Point{'s' if len(deleted) > 1 else ''} {', '.join(deleted)} deleted.")
+        missing = [point_label for point_label in point_labels if point_label not in deleted]
+        if missing:
+            print(f"Point{'s' if len(missing) > 1 else ''} {', '.join(missing)} not found.")
         wait_for_input()
 
 def input_points():
@@ -322,9 +463,54 @@ def input_points():
         if height is None:
             break
         
-        matrix[point_label] = Point(point_label, float(height))
+        if point_label in matrix:
+            matrix[point_label].height = float(height)
+        else:
+            matrix[point_label] = Point(point_label, float(height))
+        coordinates = prompt_for_coordinates(point_label)
+        if coordinates is not None:
+            matrix[point_label].x, matrix[point_label].y = coordinates
+        leveling.set_point(point_label, float(height))
+        journal_edit(("point", point_label, matrix[point_label].height, matrix[point_label].x, matrix[point_label].y))
         print(f"Point {point_label} with height {height} added.")
 
+def prompt_for_coordinates(point_label):
+    while True:
+        user_input = input(f"Enter x y coordinates for point {point_label} in {current_variables['distance_unit']} (optional, press Enter to skip): ").strip()
+        if user_input == "":
+            return None
+        try:
+            x, y = (float(value) for value in user_input.replace(",", " ").split())
+            return x, y
+        except ValueError:
+            print("Invalid coordinates. Please enter two numbers, e.g. 120 48.")
+
+def generate_distances():
+    coordinates = {label: (point.x, point.y) for label, point in matrix.items() if point.has_coordinates}
+    if len(coordinates) < 2:
+        print("You must have at least 2 points with coordinates to generate distances.")
+        wait_for_input()
+        return
+    refresh_screen()
+    print_and_dash("Generate Distances From Coordinates")
+    print("Each point is joined to its nearest neighbours; existing distances are kept.")
+    print_and_dash("Hit enter without entering a number to cancel.")
+    neighbours = validate_input("Enter number of nearest neighbours per point (e.g. 4): ", lambda x: x.isdigit() and int(x) > 0, "Invalid number. Please enter a whole number above 0.")
+    if not neighbours:
+        return
+    added = 0
+    for point1_label, point2_label, distance in spatial.knn_edges(coordinates, int(neighbours)):
+        if point2_label in matrix[point1_label].distances:
+            continue
+        distance = round(distance, 2)
+        matrix[point1_label].add_reference(point2_label, distance)
+        matrix[point2_label].add_reference(point1_label, distance)
+        leveling.set_distance(point1_label, point2_label, distance)
+        journal_edit(("distance", point1_label, point2_label, distance))
+        added += 1
+    print(f"{added} distances generated from coordinates.")
+    wait_for_input()
+
 def input_distances():
     while True:
         if len(matrix) < 2:
@@ -357,9 +543,18 @@ def input_distances():
         elif distance == "":
             continue
         
-        matrix[point1_label].add_reference(point2_label, float(distance))
-        matrix[point2_label].add_reference(point1_label, float(distance))
-        print(f"Distance between {point1_label} and {point2_label} with distance {distance} added.")
+        if point1_label == point2_label:
+            print("A distance needs two different points.")
+            wait_for_input()
+            continue
+        previous = core.set_distance(matrix, point1_label, point2_label, float(distance))
+        leveling.set_distance(point1_label, point2_label, float(distance))
+        journal_edit(("distance", point1_label, point2_label, float(distance)))
+        view.forget(point1_label, point2_label)
+        if previous is None:
+            print(f"Distance between {point1_label} and {point2_label} with distance {distance} added.")
+        else:
+            print(f"Distance between {point1_label} and {point2_label} changed from {previous} to {distance}.")
 
 def check_for_points(point_label):
     return point_label in matrix
@@ -368,8 +563,9 @@ def print_points(refresh: bool = False):
     if refresh:
         refresh_screen()
     print_and_dash("Current Points")
-    for point in matrix.values():
-        if point == list(matrix.values())[-1]:
+    last = len(matrix) - 1
+    for i, point in enumerate(matrix.values()):
+        if i == last:
             print_and_dash(str(point))
         else:
             print(str(point))
@@ -382,28 +578,49 @@ def print_distances(refresh: bool = False):
         for distance in point.distances.values():
             print(str(distance))
 
-def print_matrix(refresh: bool = False, tab_size: int = 10):
+def print_matrix(refresh: bool = False):
     if len(matrix) == 0:
         print("No points in the matrix.")
     if refresh:
         refresh_screen()
     print_and_dash("Current Matrix")
-    
-    point_labels = list(matrix.keys())
-    
-    # Print point labels and heights in the top row of the table
-    header_row = ["heights: "] + [""] + [f"{point}:{matrix[point].height}{current_variables['height_unit']}" for point in point_labels]
-    print("\t".join(header_row).expandtabs(tab_size))
-    
-    # Print distances for each point
-    for point1 in point_labels:
-        distances_row = [""] + [point1] + [f"{matrix[point1].distances[point2].distance}{current_variables['distance_unit']}" 
-                                    if point2 in matrix[point1].distances else " " 
-                                    for point2 in point_labels]
-        print("\t".join(distances_row).expandtabs(tab_size))
-
-    footer_row = ["delta: "] + [""] + [f"{point}:{matrix[point].target_thickness}{current_variables['height_unit']}" for point in point_labels]
-    print("\t".join(footer_row).expandtabs(tab_size))
+    view.set_units(current_variables["height_unit"], current_variables["distance_unit"])
+    # small matrices get the full table; larger ones a page of the sparse list, so the input screens stay fast
+    if view.fits():
+        lines, _ = view.dense(screen_width=sys.maxsize)
+    else:
+        lines = view.sparse()
+        lines.append(f"... points 1-{len(lines)} of {len(matrix)}; use Show Current Matrix to page through them all.")
+    print("\n".join(lines))
+
+def browse_matrix():
+    view.set_units(current_variables["height_unit"], current_variables["distance_unit"])
+    sparse = not view.fits()
+    first_row = first_column = 0
+    while True:
+        refresh_screen()
+        print_and_dash("Current Matrix")
+        last_row = min(first_row + matrix_view.PAGE_ROWS, len(matrix))
+        if sparse:
+            print("\n".join(view.sparse(first_row)))
+            print(f"\nPoints {first_row + 1}-{last_row} of {len(matrix)}")
+        else:
+            lines, shown = view.dense(first_row, first_column)
+            print("\n".join(lines))
+            print(f"\nRows {first_row + 1}-{last_row}, columns {first_column + 1}-{first_column + shown} of {len(matrix)}")
+        command = input("n/p: next/previous rows, r/l: right/left columns, s: sparse/table view, Enter: done: ").strip().lower()
+        if command == "":
+            break
+        elif command == "n" and last_row < len(matrix):
+            first_row = last_row
+        elif command == "p":
+            first_row = max(0, first_row - matrix_view.PAGE_ROWS)
+        elif command == "r" and not sparse and first_column + shown < len(matrix):
+            first_column += shown
+        elif command == "l" and not sparse:
+            first_column = max(0, first_column - shown)
+        elif command == "s":
+            sparse = not sparse
 
 def matrix_menu_choice(choice):
     try:
@@ -415,8 +632,9 @@ def matrix_menu_choice(choice):
             elif action == "Input Distances":
                 input_distances()
             elif action == "Show Current Matrix":
-                print_matrix(True)
-                wait_for_input()
+                browse_matrix()
+            elif action == "Generate Distances From Coordinates":
+                generate_distances()
             elif action == "Delete Points":
                 delete_points()
             elif action == "Back to Main Menu":
@@ -434,18 +652,97 @@ def matrix_menu_choice(choice):
 
 def matrix_help():
     print_and_dash("\nMatrix Menu Help")
-    print("Input Points: Input points and their heights.")
+    print("Input Points: Input points and their heights, and optionally their x/y coordinates.")
     print("Input Distances: Input distances between points.")
-    print("Show Current Matrix: Show the current matrix of points and distances.")
+    print("Generate Distances From Coordinates: Join points that have x/y coordinates to their nearest neighbours.")
+    print("Show Current Matrix: Page through the current matrix, as a table of distances or as a list of each point's distances.")
     print("Delete Points: Delete points from the matrix.")
     print("Back to Main Menu: Return to the main menu.")
     wait_for_input()
 
 
+## Reports
+
+def compare_max_slopes():
+    if len(matrix) < 2:
+        print("You must have at least 2 points to compare max slopes.")
+        wait_for_input()
+        return
+    refresh_screen()
+    print_and_dash("Compare Max Slopes")
+    print("Enter slopes separated by spaces (e.g. 0.03 0.044 0.06),")
+    print("or a range as start:stop:step (e.g. 0.02:0.08:0.005).")
+    print_and_dash("Hit enter without entering slopes to cancel.")
+    slopes = validate_input(f"Enter max slopes in {current_variables['height_unit']}/{current_variables['distance_unit']}: ", lambda x: parse_slopes(x) is not None, "Invalid slopes. Please enter numbers or start:stop:step.")
+    if not slopes:
+        return
+    rows = solver.sweep_max_slope(leveling.heights, leveling.adjacency, parse_slopes(slopes))
+    height_unit = current_variables["height_unit"]
+    print(f"\n{'max slope':>12}{'max thickness':>20}{'total thickness':>20}")
+    for row in rows:
+        max_thickness = 'X' if row["max_thickness"] is None else f"{row['max_thickness']}{height_unit}"
+        total_thickness = f"{row['total_thickness']}{height_unit}"
+        print(f"{row['max_slope']:>12}{max_thickness:>20}{total_thickness:>20}")
+    wait_for_input()
+
+def parse_slopes(text):
+    # "0.03 0.044" or "start:stop:step" (stop included); None when the text is not valid
+    try:
+        if ":" in text:
+            start, stop, step = (float(value) for value in text.split(":"))
+            if step <= 0 or stop < start:
+                return None
+            count = int(round((stop - start) / step)) + 1
+            slopes = [round(start + i * step, 6) for i in range(count)]
+        else:
+            slopes = [float(value) for value in text.replace(",", " ").split()]
+    except ValueError:
+        return None
+    if not slopes or any(slope < 0 for slope in slopes):
+        return None
+    return slopes
+
+def reports_menu_choice(choice):
+    try:
+        menu = menu_options["reports_menu"]
+        if choice in menu:
+            action = menu[choice]
+            if action == "Estimate Compound Volume":
+                estimate_compound_volume()
+            elif action == "Compare Max Slopes":
+                compare_max_slopes()
+            elif action == "Thickness At One Point":
+                query_point_thickness()
+            elif action == "Export Thickness Map":
+                export_thickness_map()
+            elif action == "Back to Main Menu":
+                return False
+            else:
+                print("Invalid choice, please try again.")
+        elif choice.lower() == 'help':
+            reports_help()
+        else:
+            print("Invalid choice, please try again.")
+    except Exception as e:
+        logging.error(f"Error in reports_menu_choice: {e}")
+        print(f"Error: {e}")
+    return True
+
+def reports_help():
+    print_and_dash("\nReports Menu Help")
+    print("Estimate Compound Volume: Estimate the compound needed from points with x/y coordinates.")
+    print("Compare Max Slopes: Show max and total thickness for several max slopes at once.")
+    print("Thickness At One Point: Get the compound thickness at a single point (e.g. a doorway) without calculating the whole floor.")
+    print("Export Thickness Map: Save a heat map of compound thickness over the floor as an image or CSV.")
+    print("Back to Main Menu: Return to the main menu.")
+    wait_for_input()
+
+
 ## Settings
 
 def save_variable_changes():
     current_variables.update(temp_variables)
+    diagnostics.set_level(current_variables["log_level"])
     try:
         with open("variables.txt", "w") as f:
             for key in current_variables:
@@ -458,6 +755,7 @@ def save_variable_changes():
 def restore_default_settings():
     current_variables.update(default_variables)
     temp_variables.update(current_variables)
+    diagnostics.set_level(current_variables["log_level"])
     print("Default settings restored.")
     wait_for_input()
 
@@ -471,6 +769,27 @@ def set_max_slope():
         print(f"Max slope set to {max_slope}.")
         wait_for_input()
 
+def set_log_level():
+    print("The current log level is set to: ", temp_variables["log_level"])
+    log_level = validate_input("Enter log level (DEBUG, INFO, WARNING, ERROR): ", lambda x: x.upper() in ("DEBUG", "INFO", "WARNING", "ERROR"), "Invalid log level.")
+    if log_level:
+        temp_variables["log_level"] = log_level.upper()
+        print(f"Log level set to {log_level.upper()}.")
+        wait_for_input()
+
+def toggle_solver_trace():
+    temp_variables["solver_trace"] = "off" if temp_variables["solver_trace"] == "on" else "on"
+    print(f"Solver trace turned {temp_variables['solver_trace']}.")
+    wait_for_input()
+
+def toggle_fixed_point():
+    temp_variables["arithmetic"] = "float" if temp_variables["arithmetic"] == "fixed" else "fixed"
+    if temp_variables["arithmetic"] == "fixed":
+        print("Fixed-point arithmetic on: heights are solved as exact whole millionths of the height unit and only results are rounded.")
+    else:
+        print("Fixed-point arithmetic off: each step is rounded to 2 decimals as before.")
+    wait_for_input()
+
 def set_height_unit():
     print("The current height unit is set to: ", temp_variables["height_unit"])
     height_unit = validate_input("Enter height unit (e.g., millimeters, centimeters, inches): ", lambda x: x != "", "Invalid height unit.")
@@ -527,6 +846,12 @@ def settings_menu_choice(choice):
                 set_max_slope()
             elif action == "Change Save Folder":
                 set_save_folder()
+            elif action == "Change Log Level":
+                set_log_level()
+            elif action == "Toggle Solver Trace":
+                toggle_solver_trace()
+            elif action == "Toggle Fixed-Point Arithmetic":
+                toggle_fixed_point()
             elif action == "Save & Return to Main Menu":
                 save_variable_changes()
                 stay_in_current_menu = False
@@ -548,7 +873,7 @@ def settings_menu_choice(choice):
         logging.error(f"Error in settings_menu_choice: {e}")
         print(f"Error: {e}")
     # check if temp_variables are different from current_variables and update the menu to reflect that
-    logging.debug(f"temp_variables: {temp_variables}, current_variables: {current_variables}")
+    logging.debug("temp_variables: %s, current_variables: %s", temp_variables, current_variables)
     if temp_variables != current_variables:
         menu_options["settings_menu"].pop("9", None)
         menu_options["settings_menu"]["5"] = "Save & Return to Main Menu"
@@ -565,6 +890,9 @@ def settings_help():
     print("Change Distance Unit: Change the unit used for distance.")
     print("Change Max Slope: Change the maximum slope allowed by the calculator.")
     print("Change Save Folder: Change the folder where saved matrices are stored.")
+    print("Change Log Level: Change how much detail is written to the log file (DEBUG, INFO, WARNING, ERROR).")
+    print("Toggle Solver Trace: Turn the per-point progress lines shown while calculating on or off.")
+    print("Toggle Fixed-Point Arithmetic: Solve in exact integer millionths of the height unit, rounding only the results (can differ by 0.01 on rounding ties).")
     print("Restore default settings: Restore the default settings (mm, inches, .044mm/inch).")
     print("-- If you have made changes to the settings you will see: --")
     print("Save & Return to Main Menu: Save the changes and return to the main menu.")
@@ -606,6 +934,10 @@ def wait_for_input():
 
 def confirm_escape():
     print("Hit enter again to confirm escape, or type anything else to remain")
+    try:
+        import msvcrt
+    except ImportError:  # not Windows: read a whole line instead of a single key
+        return input() == ""
     key = msvcrt.getch()
     if key == b'\r':  # Enter key
         return True
@@ -629,7 +961,12 @@ def validate_input(prompt, validation_func, error_message):
 # Main program
 
 if __name__ == "__main__":
+    profile_solver = "--profile" in sys.argv[1:]
+    if "--parallel" in sys.argv[1:]:
+        solver_workers = os.cpu_count() or 1
+    diagnostics.configure_logging()
     load_variables()
+    diagnostics.set_level(current_variables["log_level"])
     print_menu("main_menu", main_menu_choice)
     print("Exiting...")
     logging.info("Exiting application.")
@@ -0,0 +1,260 @@
+"""Live ingestion of streamed measurements over a local TCP or Unix socket.
+
+    python ingest.py serve --port 8765 --journal saves/site.mfj
+    python ingest.py simulate --port 8765 --rate 300
+    python ingest.py watch --port 8765
+
+Feeders send newline-delimited records in .mfj journal syntax: points, distances and "-"
+deletions (see matrix_io). Records are applied in batches, and after each batch the changed
+thicknesses are pushed to every subscriber as "label thickness" lines ('X' for a point
+without distances) and deleted points as "- label" lines. A connection subscribes by sending "subscribe" and first receives every
+current thickness. Bad records are answered with an "error ..." line and skipped.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+import core
+import matrix_io
+import solver
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.05  # seconds to collect records after the first one of a batch
+BATCH_MAX_RECORDS = 2000
+QUEUE_MAX_RECORDS = 20000  # feeders wait (and TCP pushes back) once this many are pending
+SUBSCRIBER_MAX_BUFFER = 1 << 20  # subscribers with more unsent bytes than this are dropped
+SUBSCRIBE = "subscribe"
+
+
+class IngestServer:
+    def __init__(self, matrix=None, max_slope=core.DEFAULT_MAX_SLOPE, journal=None, fixed_point=False):
+        self.matrix = {} if matrix is None else matrix
+        self.leveling = solver.IncrementalSolver(max_slope, fixed_point)
+        self.leveling.load_matrix(self.matrix)
+        self.leveling.solve()
+        self.journal = journal
+        self.subscribers = set()
+        self.records = None  # asyncio.Queue of (record, writer, line_number), made in the running loop
+        self.applied = self.rejected = self.batches = 0
+
+    async def handle_client(self, reader, writer):
+        line_number = 0
+        try:
+            async for line in reader:
+                line_number += 1
+                text = line.decode("utf-8", "replace").strip()
+                if not text:
+                    continue
+                if text == SUBSCRIBE:
+                    self.subscribe(writer)
+                    continue
+                try:
+                    for _, record in matrix_io.read_journal((text,), "<client>", line_number):
+                        await self.records.put((record, writer, line_number))
+                except matrix_io.MatrixFileError as e:
+                    self.reject(writer, e)
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    def reject(self, writer, error):
+        self.rejected += 1
+        if not writer.is_closing():
+            writer.write(f"error {error}\n".encode())
+
+    def subscribe(self, writer):
+        self.subscribers.add(writer)
+        thicknesses = self.leveling.thicknesses
+        writer.write("".join(f"{label} {thicknesses.get(label, 'X')}\n" for label in self.matrix).encode())
+
+    def publish(self, changed, deleted=()):
+        if not (changed or deleted) or not self.subscribers:
+            return
+        lines = [f"- {label}\n" for label in deleted if label not in self.matrix]
+        lines.extend(f"{label} {'X' if thickness is None else thickness}\n" for label, thickness in changed.items())
+        data = "".join(lines).encode()
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > SUBSCRIBER_MAX_BUFFER:
+                # a subscriber that stopped reading must not hold up everyone else
+                self.subscribers.discard(writer)
+                writer.close()
+            else:
+                writer.write(data)
+
+    async def apply_batches(self):
+        while True:
+            batch = [await self.records.get()]
+            await asyncio.sleep(BATCH_WINDOW)
+            while len(batch) < BATCH_MAX_RECORDS and not self.records.empty():
+                batch.append(self.records.get_nowait())
+            try:
+                await self.apply(batch)
+            except Exception:  # a bad batch must not stop ingestion for every later client
+                logging.exception("Error applying a batch of %d record(s)", len(batch))
+
+    async def apply(self, batch):
+        applied = []
+        deleted = set()
+        for record, writer, line_number in batch:
+            try:
+                matrix_io.apply_record(self.matrix, record, source="<client>", line_number=line_number)
+            except matrix_io.MatrixFileError as e:
+                self.reject(writer, e)
+                continue
+            self._mirror(record)
+            applied.append(record)
+            if record[0] == "delete_point":
+                deleted.add(record[1])
+        if self.journal is not None and applied:
+            # the fsync runs off the event loop so reading and publishing carry on meanwhile
+            await asyncio.to_thread(self.journal.extend, applied)
+            if self.journal.should_compact():
+                self.journal.compact(self.matrix)
+        self.applied += len(applied)
+        self.batches += 1
+        self.publish(self.leveling.solve(), deleted)
+
+    def _mirror(self, record):
+        kind = record[0]
+        if kind == "point":
+            self.leveling.set_point(record[1], record[2])
+        elif kind == "distance":
+            self.leveling.set_distance(*record[1:])
+        elif kind == "delete_point":
+            self.leveling.remove_point(record[1])
+        else:
+            self.leveling.remove_distance(*record[1:])
+
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+    server.records = asyncio.Queue(QUEUE_MAX_RECORDS)
+    if unix:
+        listener = await asyncio.start_unix_server(server.handle_client, unix)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host, port)
+    print(f"Listening on {unix or f'{host}:{port}'} with {len(server.matrix)} points; Ctrl+C to stop.", file=sys.stderr)
+    batcher = asyncio.create_task(server.apply_batches())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+async def connect(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def simulate(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, count=1000, rate=200.0, spacing=24.0, seed=None):
+    # A stand-in laser level walking a square grid: each reading is a point followed by its
+    # distances to the already measured left and upper neighbours, paced at about rate records/s.
+    reader, writer = await connect(host, port, unix)
+    rng = random.Random(seed)
+    side = max(1, round(count ** 0.5))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = 0
+    for i in range(count):
+        row, column = divmod(i, side)
+        label = f"S{row}_{column}"
+        lines = [f"{label} {round(rng.uniform(0.0, 20.0), 2)} {column * spacing} {row * spacing}\n"]
+        if column:
+            lines.append(f"{label} S{row}_{column - 1} {spacing}\n")
+        if row:
+            lines.append(f"{label} S{row - 1}_{column} {spacing}\n")
+        writer.write("".join(lines).encode())
+        sent += len(lines)
+        await writer.drain()
+        delay = started + sent / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    writer.write_eof()
+    errors = [line.decode().rstrip() async for line in reader]
+    writer.close()
+    elapsed = loop.time() - started
+    print(f"Sent {sent} records in {elapsed:.1f}s ({sent / elapsed if elapsed else 0:.0f}/s), {len(errors)} rejected.",
+          file=sys.stderr)
+    for error in errors[:10]:
+        print(error, file=sys.stderr)
+
+
+async def watch(host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, stream=None):
+    reader, writer = await connect(host, port, unix)
+    writer.write(f"{SUBSCRIBE}\n".encode())
+    await writer.drain()
+    stream = stream or sys.stdout
+    async for line in reader:
+        stream.write(line.decode())
+        stream.flush()
+
+
+def open_server(args):
+    # Starts from --load and/or an existing --journal; a new journal starts with a snapshot.
+    matrix = core.load_matrix(args.load) if args.load else {}
+    journal = None
+    if args.journal:
+        if os.path.exists(args.journal):
+            if args.load:
+                raise SystemExit(f"{args.journal} already exists; drop --load to continue it")
+            journal, matrix = matrix_io.MatrixJournal.open(args.journal)
+        else:
+            journal = matrix_io.MatrixJournal(args.journal)
+            journal.compact(matrix)
+    return IngestServer(matrix, args.max_slope, journal, args.fixed_point)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream measurements into a live leveling solve.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="accept records and publish thicknesses")
+    simulate_parser = commands.add_parser("simulate", help="stream synthetic readings to a server")
+    watch_parser = commands.add_parser("watch", help="print thicknesses as a server publishes them")
+    for command in (serve_parser, simulate_parser, watch_parser):
+        command.add_argument("--host", default=DEFAULT_HOST)
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+        command.add_argument("--unix", metavar="PATH", help="use a Unix socket instead of TCP")
+    serve_parser.add_argument("--max-slope", type=float, default=core.DEFAULT_MAX_SLOPE)
+    serve_parser.add_argument("--fixed-point", action="store_true", help="solve with integer micro-units")
+    serve_parser.add_argument("--load", metavar="FILE", help="start from a saved .mf/.mfb/.mfj matrix")
+    serve_parser.add_argument("--journal", metavar="FILE.mfj", help="append every applied record to this journal")
+    serve_parser.add_argument("--log", metavar="FILE", help="append solve records to this log file (default: no log)")
+    serve_parser.add_argument("--log-level", default="INFO", help="e.g. DEBUG, INFO, WARNING")
+    simulate_parser.add_argument("--count", type=int, default=1000, help="readings (points) to send")
+    simulate_parser.add_argument("--rate", type=float, default=200.0, help="records per second")
+    simulate_parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "serve":
+            if args.log:
+                import diagnostics
+                diagnostics.configure_logging(args.log, args.log_level)
+            server = open_server(args)
+            started = time.perf_counter()
+            try:
+                asyncio.run(serve(server, args.host, args.port, args.unix))
+            finally:
+                if server.journal is not None:
+                    server.journal.close()
+                print(f"Applied {server.applied} records ({server.rejected} rejected) in {server.batches} batches "
+                      f"over {time.perf_counter() - started:.1f}s.", file=sys.stderr)
+        elif args.command == "simulate":
+            asyncio.run(simulate(args.host, args.port, args.unix, args.count, args.rate, seed=args.seed))
+        else:
+            asyncio.run(watch(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,542 @@
+"""Reading and writing matrix files.
+
+A .mf file is plain text with one record per line:
+    label height [x y]          a point, optionally with coordinates
+    point1 point2 distance      a distance between two points
+
+A .mfj journal uses the same lines plus deletions ("- label", "- point1 point2") and is only
+ever appended to; see MatrixJournal.
+
+A .mfb file holds the same data as packed little-endian arrays (see save_mfb) and is opened
+with mmap, so no parsing happens on load.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+import csr
+
+PROGRESS_EVERY = 100_000  # lines between progress callbacks
+
+
+class MatrixFileError(ValueError):
+    def __init__(self, source, line_number, message):
+        if line_number is None:
+            super().__init__(f"{source}: {message}")
+        else:
+            super().__init__(f"{source}, line {line_number}: {message}")
+        self.source = source
+        self.line_number = line_number
+
+
+def read_records(lines, source="<matrix>"):
+    # Yields (line_number, record) for each non-blank line, where record is
+    # ("point", label, height, x, y) or ("distance", point1, point2, distance).
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        parts = line.split()
+        if parts:
+            yield line_number, _parse_record(parts, line, source, line_number)
+
+
+def _parse_record(parts, line, source, line_number):
+    try:
+        if len(parts) == 2:
+            return ("point", parts[0], float(parts[1]), None, None)
+        elif len(parts) == 4:
+            return ("point", parts[0], float(parts[1]), float(parts[2]), float(parts[3]))
+        elif len(parts) == 3:
+            return ("distance", parts[0], parts[1], float(parts[2]))
+    except ValueError:
+        raise MatrixFileError(source, line_number, f"not a number in {line.strip()!r}") from None
+    raise MatrixFileError(source, line_number, f"expected 2, 3 or 4 fields, found {len(parts)}: {line.strip()!r}")
+
+
+def build_matrix(records, point_factory=None, source="<matrix>"):
+    # Single pass over read_records() output. A distance may name a point that is defined
+    # further down; it is parked until that point arrives and reported if it never does.
+    point_factory = _point_factory(point_factory)
+    matrix = {}
+    pending = {}
+    for line_number, record in records:
+        if record[0] == "point":
+            _, label, height, x, y = record
+            if label in matrix:
+                # a repeated point line updates the point and keeps its distances
+                matrix[label].height, matrix[label].x, matrix[label].y = height, x, y
+                continue
+            matrix[label] = point_factory(label, height, x, y)
+            for point1, point2, distance, edge_line in pending.pop(label, ()):
+                if point1 in matrix and point2 in matrix:
+                    _link(matrix, point1, point2, distance)
+                else:
+                    missing = point1 if point1 not in matrix else point2
+                    pending.setdefault(missing, []).append((point1, point2, distance, edge_line))
+        else:
+            _, point1, point2, distance = record
+            if point1 == point2:
+                raise MatrixFileError(source, line_number, f"distance {point1}-{point2} must join two different points")
+            if point1 in matrix and point2 in matrix:
+                _link(matrix, point1, point2, distance)
+            else:
+                missing = point1 if point1 not in matrix else point2
+                pending.setdefault(missing, []).append((point1, point2, distance, line_number))
+    if pending:
+        label, edges = next(iter(pending.items()))
+        point1, point2, _, line_number = edges[0]
+        unresolved = sum(len(edges) for edges in pending.values())
+        raise MatrixFileError(source, line_number, f"distance {point1}-{point2} references point {label}, "
+                                                   f"which is never defined ({unresolved} unresolved distance(s))")
+    return matrix
+
+
+def _point_factory(point_factory):
+    if point_factory is None:
+        from core import Point  # core imports this module
+        return Point
+    return point_factory
+
+
+def _link(matrix, point1, point2, distance):
+    matrix[point1].add_reference(point2, distance)
+    matrix[point2].add_reference(point1, distance)
+
+
+def _progress_lines(f, total_bytes, progress):
+    done = 0
+    for line_number, line in enumerate(f, 1):
+        done += len(line)
+        if line_number % PROGRESS_EVERY == 0:
+            progress(done, total_bytes)
+        yield line
+    progress(done, total_bytes)
+
+
+def load_mf(path, point_factory=None, progress=None):
+    """Stream a .mf file into a new {label: Point} dict built with point_factory(label, height, x, y)
+    (core.Point by default).
+
+    progress, if given, is called as progress(bytes_read, total_bytes) while reading.
+    Raises MatrixFileError for malformed lines and distances to undefined points.
+    """
+    with open(path, "rb") as f:
+        lines = f if progress is None else _progress_lines(f, os.fstat(f.fileno()).st_size, progress)
+        return build_matrix(read_records(lines, path), point_factory, path)
+
+
+def save_mf(path, matrix):
+    # Points first, then each distance once, so the file loads without forward references.
+    position = {label: i for i, label in enumerate(matrix)}
+    with open(path, "w") as f:
+        for point in matrix.values():
+            if getattr(point, "x", None) is not None and getattr(point, "y", None) is not None:
+                f.write(f"{point.label} {point.height} {point.x} {point.y}\n")
+            else:
+                f.write(f"{point.label} {point.height}\n")
+        for label, point in matrix.items():
+            for neighbor, distance in point.distances.items():
+                if neighbor not in matrix:
+                    continue
+                if position[neighbor] > position[label] or label not in matrix[neighbor].distances:
+                    f.write(f"{label} {neighbor} {distance.distance}\n")
+
+
+def graph_to_matrix(graph, point_factory=None):
+    # Expands a csr.CSRGraph into a {label: Point} dict for the interactive calculator.
+    point_factory = _point_factory(point_factory)
+    matrix = {}
+    for point in graph.values():
+        matrix[point.label] = point_factory(point.label, point.height, point.x, point.y)
+    labels = graph.labels
+    for i in range(len(graph)):
+        point = matrix[labels[i]]
+        for slot in range(graph.offsets[i], graph.offsets[i + 1]):
+            point.add_reference(labels[graph.neighbors[slot]], graph.distances[slot])
+    return matrix
+
+
+def load_matrix_file(path, point_factory=None, progress=None):
+    # Loads .mf, .mfb or .mfj into a {label: Point} dict, picking the reader from the extension.
+    if path.endswith(".mfb"):
+        return graph_to_matrix(load_mfb(path), point_factory)
+    if path.endswith(JOURNAL_EXTENSION):
+        return load_journal(path, point_factory, progress)
+    return load_mf(path, point_factory, progress)
+
+
+def read_mf_graph(path):
+    # Reads a .mf file straight into a csr.CSRGraph, without building Point objects.
+    heights = {}
+    coordinates = {}
+    distances = []
+    for _, record in read_records(_open_lines(path), path):
+        if record[0] == "point":
+            _, label, height, x, y = record
+            heights[label] = height
+            if x is not None:
+                coordinates[label] = (x, y)
+            else:
+                coordinates.pop(label, None)
+        else:
+            distances.append(record[1:])
+    try:
+        return csr.CSRGraph.from_edges(heights, distances, coordinates)
+    except ValueError as e:
+        raise MatrixFileError(path, None, str(e)) from None
+
+
+def _open_lines(path):
+    with open(path, "rb") as f:
+        yield from f
+
+
+def save_csr_mf(path, graph):
+    # Writes a csr.CSRGraph as .mf text: points first, then each distance once.
+    labels = graph.labels
+    with open(path, "w") as f:
+        for point in graph.values():
+            if point.x is not None and point.y is not None:
+                f.write(f"{point.label} {point.height} {point.x} {point.y}\n")
+            else:
+                f.write(f"{point.label} {point.height}\n")
+        for i in range(len(graph)):
+            for slot in range(graph.offsets[i], graph.offsets[i + 1]):
+                j = graph.neighbors[slot]
+                if j > i:
+                    f.write(f"{labels[i]} {labels[j]} {graph.distances[slot]}\n")
+
+
+# Journals (.mfj). Every edit is appended as one line and later lines override earlier ones,
+# so a journal loads by replaying it top to bottom:
+#   label height [x y]          set a point (height and coordinates)
+#   point1 point2 distance      set a distance, replacing any earlier one
+#   - label                     delete a point and its distances
+#   - point1 point2             delete a distance
+# Compaction atomically replaces the file with a snapshot of the live points and distances,
+# which the following edits are appended to again.
+JOURNAL_EXTENSION = ".mfj"
+COMPACT_MIN_RECORDS = 1000  # never compact tails shorter than this
+
+
+def read_journal(lines, source="<journal>", start=1):
+    # Like read_records(), plus ("delete_point", label) and ("delete_distance", point1, point2).
+    # start is the line number of the first line, for callers that feed lines one at a time.
+    for line_number, line in enumerate(lines, start):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] != "-":
+            yield line_number, _parse_record(parts, line, source, line_number)
+        elif len(parts) == 2:
+            yield line_number, ("delete_point", parts[1])
+        elif len(parts) == 3:
+            yield line_number, ("delete_distance", parts[1], parts[2])
+        else:
+            raise MatrixFileError(source, line_number, f"expected a point or two points after '-': {line.strip()!r}")
+
+
+def replay_journal(records, point_factory=None, source="<journal>"):
+    # Applies read_journal() output in order and returns (matrix, record count).
+    point_factory = _point_factory(point_factory)
+    matrix = {}
+    count = 0
+    for line_number, record in records:
+        count += 1
+        apply_record(matrix, record, point_factory, source, line_number)
+    return matrix, count
+
+
+def apply_record(matrix, record, point_factory=None, source="<journal>", line_number=None):
+    # Applies one read_journal() record to a {label: Point} dict, the way a journal replays it.
+    kind = record[0]
+    if kind == "point":
+        _, label, height, x, y = record
+        if label in matrix:
+            matrix[label].height, matrix[label].x, matrix[label].y = height, x, y
+        else:
+            matrix[label] = _point_factory(point_factory)(label, height, x, y)
+    elif kind == "distance":
+        _, point1, point2, distance = record
+        for label in (point1, point2):
+            if label not in matrix:
+                raise MatrixFileError(source, line_number, f"distance {point1}-{point2} references point {label}, "
+                                                           f"which is not defined at that point")
+        if point1 == point2:
+            raise MatrixFileError(source, line_number, f"distance {point1}-{point2} must join two different points")
+        matrix[point1].distances.pop(point2, None)
+        matrix[point2].distances.pop(point1, None)
+        _link(matrix, point1, point2, distance)
+    elif kind == "delete_point":
+        point = matrix.pop(record[1], None)
+        if point is not None:
+            for neighbor in point.distances:
+                if neighbor in matrix:
+                    matrix[neighbor].distances.pop(point.label, None)
+    else:
+        _, point1, point2 = record
+        if point1 in matrix:
+            matrix[point1].distances.pop(point2, None)
+        if point2 in matrix:
+            matrix[point2].distances.pop(point1, None)
+
+
+def _trim_torn_tail(path):
+    # A crash mid-append can leave a final line without its newline; drop it so the
+    # journal replays cleanly and new records start on a line of their own.
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            block = f.read(position - start)
+            if position == end and block.endswith(b"\n"):
+                return 0
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        f.truncate(position)
+        return end - position
+
+
+def load_journal(path, point_factory=None, progress=None):
+    # Replays a .mfj journal into a new {label: Point} dict, ignoring a torn final line.
+    with open(path, "rb") as f:
+        lines = f if progress is None else _progress_lines(f, os.fstat(f.fileno()).st_size, progress)
+        return replay_journal(read_journal(_complete_lines(lines), path), point_factory, path)[0]
+
+
+def _complete_lines(lines):
+    for line in lines:
+        if line.endswith(b"\n"):
+            yield line
+
+
+def _journal_line(record):
+    kind = record[0]
+    if kind == "point":
+        _, label, height, x, y = record
+        if x is not None and y is not None:
+            return f"{label} {height} {x} {y}\n"
+        return f"{label} {height}\n"
+    if kind == "distance":
+        return f"{record[1]} {record[2]} {record[3]}\n"
+    return "- " + " ".join(record[1:]) + "\n"
+
+
+class MatrixJournal:
+    """Append-only save file for a matrix that is edited a point at a time.
+
+    append() writes one record in the read_journal() tuple shape and syncs it to disk, so
+    each save is O(1) and every completed edit survives a crash. Once the records appended
+    since the last snapshot outnumber the snapshot (and COMPACT_MIN_RECORDS),
+    should_compact() turns true and compact() rewrites the file from the live matrix.
+    """
+
+    def __init__(self, path, snapshot_records=0, tail_records=0, compact_min_records=COMPACT_MIN_RECORDS):
+        self.path = path
+        self.snapshot_records = snapshot_records
+        self.tail_records = tail_records
+        self.compact_min_records = compact_min_records
+        self._file = None
+
+    @classmethod
+    def open(cls, path, point_factory=None, progress=None):
+        # Returns (journal, matrix) for an existing journal, ready for further appends.
+        _trim_torn_tail(path)
+        with open(path, "rb") as f:
+            lines = f if progress is None else _progress_lines(f, os.fstat(f.fileno()).st_size, progress)
+            matrix, count = replay_journal(read_journal(lines, path), point_factory, path)
+        snapshot = _live_records(matrix)
+        return cls(path, snapshot, max(0, count - snapshot)), matrix
+
+    def append(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(_journal_line(record))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.tail_records += 1
+
+    def extend(self, records):
+        # append() for a batch of records with a single sync at the end
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        count = 0
+        for record in records:
+            self._file.write(_journal_line(record))
+            count += 1
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.tail_records += count
+
+    def should_compact(self):
+        return self.tail_records > max(self.compact_min_records, self.snapshot_records)
+
+    def compact(self, matrix):
+        # Writes the snapshot beside the journal and swaps it in, so a crash leaves either
+        # the old journal or the new snapshot, never a mix.
+        self.close()
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        save_mf(temporary, matrix)
+        with open(temporary, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.snapshot_records = _live_records(matrix)
+        self.tail_records = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _live_records(matrix):
+    return len(matrix) + sum(len(point.distances) for point in matrix.values()) // 2
+
+
+# .mfb layout, all integers little-endian and every section padded to 8 bytes:
+#   header (64 bytes): magic, version, flags, point count, edge entry count, label bytes
+#   label offsets   int64[points + 1]     label i is label_bytes[offsets[i]:offsets[i + 1]], UTF-8
+#   label bytes     uint8[label bytes]
+#   heights         float64[points]
+#   xs, ys          float64[points] each, only when flags has MFB_HAS_COORDINATES (NaN = none)
+#   offsets         int64[points + 1]     CSR row offsets, as in csr.CSRGraph
+#   neighbors       int64[edge entries]
+#   distances       float64[edge entries]
+MFB_MAGIC = b"LVMF"
+MFB_VERSION = 1
+MFB_HAS_COORDINATES = 1
+_MFB_HEADER = struct.Struct("<4sHHQQQ")
+_MFB_HEADER_SIZE = 64
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+class LabelTable(Sequence):
+    # Labels decoded on access from the mapped label section.
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("label index out of range")
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+
+def _section_bytes(values, typecode):
+    if isinstance(values, memoryview):
+        return values.tobytes()
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder != "little":
+        values = array(typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def save_mfb(path, graph):
+    encoded = [str(label).encode("utf-8") for label in graph.labels]
+    label_offsets = array("q", [0])
+    for label in encoded:
+        label_offsets.append(label_offsets[-1] + len(label))
+    has_coordinates = graph.xs is not None and graph.ys is not None
+    sections = [_section_bytes(label_offsets, "q"), b"".join(encoded), _section_bytes(graph.heights, "d")]
+    if has_coordinates:
+        sections += [_section_bytes(graph.xs, "d"), _section_bytes(graph.ys, "d")]
+    sections += [_section_bytes(graph.offsets, "q"), _section_bytes(graph.neighbors, "q"),
+                 _section_bytes(graph.distances, "d")]
+    header = _MFB_HEADER.pack(MFB_MAGIC, MFB_VERSION, MFB_HAS_COORDINATES if has_coordinates else 0,
+                              len(graph.labels), len(graph.neighbors), label_offsets[-1])
+    with open(path, "wb") as f:
+        f.write(header.ljust(_MFB_HEADER_SIZE, b"\0"))
+        for section in sections:
+            f.write(section)
+            f.write(b"\0" * (_padded(len(section)) - len(section)))
+
+
+def load_mfb(path):
+    """Map a .mfb file and return a csr.CSRGraph whose arrays are views onto the file.
+
+    Heights, coordinates and edges are read-only; thicknesses get a fresh writable array.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _MFB_HEADER_SIZE:
+            raise MatrixFileError(path, None, "file is too short to be a .mfb matrix")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    magic, version, flags, count, entries, label_bytes = _MFB_HEADER.unpack_from(view, 0)
+    if magic != MFB_MAGIC:
+        raise MatrixFileError(path, None, "not a .mfb matrix file")
+    if version != MFB_VERSION:
+        raise MatrixFileError(path, None, f"unsupported .mfb version {version}")
+    has_coordinates = bool(flags & MFB_HAS_COORDINATES)
+    expected = (_MFB_HEADER_SIZE + 8 * (count + 1) + _padded(label_bytes) + 8 * count * (3 if has_coordinates else 1)
+                + 8 * (count + 1) + 16 * entries)
+    if size < expected:
+        raise MatrixFileError(path, None, f"file is truncated ({size} of {expected} bytes)")
+
+    position = _MFB_HEADER_SIZE
+
+    def take(length, typecode):
+        nonlocal position
+        section = view[position:position + length * (1 if typecode == "B" else 8)]
+        position += _padded(len(section))
+        if typecode == "B":
+            return section
+        section = section.cast(typecode)
+        if sys.byteorder != "little":
+            section = array(typecode, section.tobytes())
+            section.byteswap()
+        return section
+
+    label_offsets = take(count + 1, "q")
+    labels = LabelTable(label_offsets, take(label_bytes, "B"))
+    heights = take(count, "d")
+    xs = take(count, "d") if has_coordinates else None
+    ys = take(count, "d") if has_coordinates else None
+    offsets = take(count + 1, "q")
+    neighbors = take(entries, "q")
+    distances = take(entries, "d")
+    return csr.CSRGraph(labels, heights, offsets, neighbors, distances, xs=xs, ys=ys)
+
+
+def mf_to_mfb(source, destination):
+    save_mfb(destination, read_mf_graph(source))
+
+
+def mfb_to_mf(source, destination):
+    save_csr_mf(destination, load_mfb(source))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert matrix files between .mf text and .mfb binary.")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args()
+    if args.source.endswith(".mfb"):
+        mfb_to_mf(args.source, args.destination)
+    else:
+        mf_to_mfb(args.source, args.destination)
+    print(f"Converted {args.source} -> {args.destination}")
@@ -0,0 +1,116 @@
+"""Windowed console views of a {label: Point} matrix.
+
+The dense view is the distance table the calculator has always shown, but only a window
+of it (some rows, and as many columns as fit the screen) is built per redraw. Column widths
+are cached per point and recomputed only when that point's height, thickness or number of
+distances changes, so a redraw costs O(visible cells) rather than O(N^2). The sparse view
+lists only the distances that exist, one point per line.
+"""
+import shutil
+
+PAGE_ROWS = 20
+COLUMN_GAP = 2
+
+
+class MatrixView:
+    def __init__(self, matrix, height_unit="", distance_unit=""):
+        self.matrix = matrix
+        self.height_unit = height_unit
+        self.distance_unit = distance_unit
+        self._labels = []
+        self._widths = {}  # label -> (signature, column width)
+
+    def invalidate(self):
+        # Forget everything, e.g. after the whole matrix was replaced by a load.
+        self._labels = []
+        self._widths.clear()
+
+    def forget(self, *labels):
+        # Drop cached widths for points whose distances changed without changing in number.
+        for label in labels:
+            self._widths.pop(label, None)
+
+    def set_units(self, height_unit, distance_unit):
+        if (height_unit, distance_unit) != (self.height_unit, self.distance_unit):
+            self.height_unit, self.distance_unit = height_unit, distance_unit
+            self._widths.clear()
+
+    @property
+    def labels(self):
+        # Point order, rebuilt only when points were added or removed. New points always go
+        # to the end of the dict, so the count and the last label catch every change the
+        # menus make; invalidate() covers wholesale replacement.
+        labels = self._labels
+        if len(labels) != len(self.matrix) or (labels and labels[-1] != next(reversed(self.matrix))):
+            self._labels = labels = list(self.matrix)
+        return labels
+
+    def height_cell(self, label):
+        return f"{label}:{self.matrix[label].height}{self.height_unit}"
+
+    def thickness_cell(self, label):
+        return f"{label}:{self.matrix[label].target_thickness}{self.height_unit}"
+
+    def distance_cell(self, point1, point2):
+        distance = self.matrix[point1].distances.get(point2)
+        return " " if distance is None else f"{distance.distance}{self.distance_unit}"
+
+    def column_width(self, label):
+        point = self.matrix[label]
+        signature = (point.height, point.target_thickness, len(point.distances))
+        cached = self._widths.get(label)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        # distances are stored both ways, so a column's cells are the point's own distances
+        width = max(len(self.height_cell(label)), len(self.thickness_cell(label)),
+                    max((len(f"{distance.distance}{self.distance_unit}") for distance in point.distances.values()),
+                        default=0))
+        self._widths[label] = (signature, width + COLUMN_GAP)
+        return width + COLUMN_GAP
+
+    def title_width(self, row_labels):
+        return max([len("heights: "), len("delta: ")] + [len(label) for label in row_labels]) + COLUMN_GAP
+
+    def columns_that_fit(self, first_column, screen_width):
+        labels = self.labels
+        used = 0
+        count = 0
+        for label in labels[first_column:]:
+            used += self.column_width(label)
+            if count and used > screen_width:
+                break
+            count += 1
+        return count
+
+    def dense(self, first_row=0, first_column=0, rows=PAGE_ROWS, screen_width=None):
+        # Lines of the dense table for a window of rows x (as many columns as fit).
+        if screen_width is None:
+            screen_width = shutil.get_terminal_size().columns
+        labels = self.labels
+        row_labels = labels[first_row:first_row + rows]
+        title_width = self.title_width(row_labels)
+        columns = labels[first_column:first_column + self.columns_that_fit(first_column, screen_width - title_width)]
+        widths = [self.column_width(label) for label in columns]
+
+        def line(title, cells):
+            return (title.ljust(title_width) + "".join(cell.ljust(width) for cell, width in zip(cells, widths))).rstrip()
+
+        lines = [line("heights: ", [self.height_cell(label) for label in columns])]
+        lines.extend(line(point1, [self.distance_cell(point1, point2) for point2 in columns]) for point1 in row_labels)
+        lines.append(line("delta: ", [self.thickness_cell(label) for label in columns]))
+        return lines, len(columns)
+
+    def sparse(self, first_row=0, rows=PAGE_ROWS):
+        # One line per point in the window: height, thickness and only the distances that exist.
+        lines = []
+        for label in self.labels[first_row:first_row + rows]:
+            point = self.matrix[label]
+            distances = ", ".join(f"{neighbor} {distance.distance}{self.distance_unit}"
+                                  for neighbor, distance in point.distances.items())
+            lines.append(f"{label}: height {point.height}{self.height_unit}, "
+                         f"delta {point.target_thickness}{self.height_unit} | {distances or 'no distances'}")
+        return lines
+
+    def fits(self, rows=PAGE_ROWS):
+        # Small matrices are shown whole, as the calculator always has.
+        return len(self.labels) <= rows
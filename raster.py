@@ -0,0 +1,312 @@
+"""Thickness heat maps: target_thickness interpolated onto a raster by inverse-distance weighting.
+
+    python raster.py saves/floor.mf --resolution 0.01 --output floor.ppm
+
+Each pixel gets the IDW mean of its nearest measured points. The raster is computed in square
+tiles sized to hold a few points; each tile asks the spatial index only for the points
+that can be among its pixels' nearest, so time grows about linearly with the pixel count.
+Finished bands of tiles are written straight out as PGM/PPM images or CSV, so memory stays
+bounded by one band however large the floor. Vectorised with NumPy when it is installed.
+"""
+import heapq
+import math
+import os
+import sys
+from array import array
+
+import spatial
+import volume
+
+DEFAULT_NEIGHBOURS = 8
+DEFAULT_POWER = 2.0
+MAX_TILE_PIXELS = 256  # tile side
+MIN_TILE_PIXELS = 16
+BLOCK_CELLS = 1 << 22  # pixel-to-point distances held at once per tile
+FORMATS = ("pgm", "ppm", "csv")
+NO_DATA = float("nan")  # pixels with no point within max_distance
+
+
+def _ramp(level):
+    # Blue (thin) through green to red (thick); level 0 is reserved for no data (black).
+    if level == 0:
+        return b"\0\0\0"
+    f = (level - 1) / 254.0
+    if f < 0.5:
+        return bytes((0, round(510 * f), round(255 * (1 - 2 * f))))
+    return bytes((round(255 * (2 * f - 1)), round(510 * (1 - f)), 0))
+
+
+PALETTE = [_ramp(level) for level in range(256)]
+
+
+class Grid:
+    # Pixel (row, column) is centred on (left + (column + 0.5) * resolution,
+    # top - (row + 0.5) * resolution): row 0 is the largest y, as in a plan drawing.
+    def __init__(self, xs, ys, resolution, margin=0.0):
+        if resolution <= 0:
+            raise ValueError("Resolution must be greater than 0.")
+        self.resolution = float(resolution)
+        self.left = min(xs) - margin
+        self.top = max(ys) + margin
+        self.width = max(1, math.ceil((max(xs) + margin - self.left) / self.resolution))
+        self.height = max(1, math.ceil((self.top - (min(ys) - margin)) / self.resolution))
+
+    def column_x(self, column):
+        return self.left + (column + 0.5) * self.resolution
+
+    def row_y(self, row):
+        return self.top - (row + 0.5) * self.resolution
+
+
+def tile_pixels(grid, count, neighbours):
+    # Tiles hold about a quarter of `neighbours` points on average: the candidates per pixel stay
+    # bounded, and below that the per-tile index queries start to dominate.
+    area = grid.width * grid.height * grid.resolution ** 2
+    side = math.sqrt(area * neighbours / count) / 2 / grid.resolution
+    return max(MIN_TILE_PIXELS, min(MAX_TILE_PIXELS, int(side)))
+
+
+def _candidates(index, grid, row0, row1, column0, column1, neighbours, max_distance):
+    # Every point that is among the nearest `neighbours` of some pixel in the tile: a pixel is
+    # at most `half` from the tile centre, so its k-th nearest point is within nearest + half
+    # of the pixel, and within nearest + 2 * half of the centre.
+    x = (grid.column_x(column0) + grid.column_x(column1 - 1)) / 2
+    y = (grid.row_y(row0) + grid.row_y(row1 - 1)) / 2
+    half = math.hypot(column1 - column0, row1 - row0) * grid.resolution / 2
+    nearest = index.nearest(x, y, neighbours)
+    reach = nearest[-1][0] + 2 * half
+    if max_distance is not None:
+        if nearest[0][0] - half > max_distance:
+            return []
+        reach = min(reach, max_distance + half)
+    return [i for i, _ in index.within(x, y, reach)]
+
+
+def _tile_python(index, values, grid, row0, row1, column0, column1, candidates, neighbours, power, max_distance):
+    xs, ys = index.xs, index.ys
+    points = [(xs[i], ys[i], values[i]) for i in candidates]
+    rows = []
+    for row in range(row0, row1):
+        y = grid.row_y(row)
+        out = array("d")
+        for column in range(column0, column1):
+            x = grid.column_x(column)
+            near = heapq.nsmallest(neighbours, ((math.hypot(px - x, py - y), value) for px, py, value in points))
+            if max_distance is not None:
+                near = [pair for pair in near if pair[0] <= max_distance]
+            if not near:
+                out.append(NO_DATA)
+            elif near[0][0] == 0:
+                hits = [value for distance, value in near if distance == 0]
+                out.append(sum(hits) / len(hits))
+            else:
+                weights = [distance ** -power for distance, _ in near]
+                out.append(sum(weight * value for weight, (_, value) in zip(weights, near)) / sum(weights))
+        rows.append(out)
+    return rows
+
+
+def _tile_numpy(index, values, grid, row0, row1, column0, column1, candidates, neighbours, power, max_distance):
+    import numpy as np
+    candidates = np.asarray(candidates)
+    cxs, cys, cvalues = index.xs_array[candidates], index.ys_array[candidates], values[candidates]
+    px = grid.left + (np.arange(column0, column1) + 0.5) * grid.resolution
+    tile = np.empty((row1 - row0, column1 - column0))
+    step = max(1, BLOCK_CELLS // (len(px) * len(candidates)))
+    for start in range(row0, row1, step):
+        stop = min(start + step, row1)
+        py = grid.top - (np.arange(start, stop) + 0.5) * grid.resolution
+        gx, gy = np.meshgrid(px, py)
+        distances = np.hypot(gx.reshape(-1, 1) - cxs, gy.reshape(-1, 1) - cys)
+        if len(candidates) > neighbours:
+            nearest = np.argpartition(distances, neighbours - 1, axis=1)[:, :neighbours]
+            distances = np.take_along_axis(distances, nearest, axis=1)
+            near_values = cvalues[nearest]
+        else:
+            near_values = np.broadcast_to(cvalues, distances.shape)
+        hits = distances == 0
+        with np.errstate(divide="ignore"):
+            weights = np.where(hits, 0.0, distances ** -power)
+        if max_distance is not None:
+            weights[distances > max_distance] = 0.0
+        totals = weights.sum(axis=1)
+        with np.errstate(invalid="ignore"):
+            result = (weights * near_values).sum(axis=1) / totals
+        hit_counts = hits.sum(axis=1)
+        exact = hit_counts > 0
+        result[exact] = (near_values * hits)[exact].sum(axis=1) / hit_counts[exact]
+        result[(totals == 0) & ~exact] = np.nan
+        tile[start - row0:stop - row0] = result.reshape(stop - start, -1)
+    return tile
+
+
+def interpolate_bands(xs, ys, values, grid, neighbours=DEFAULT_NEIGHBOURS, power=DEFAULT_POWER, max_distance=None):
+    """Yield the raster top to bottom, one band of tiles at a time.
+
+    Each band is a list of array("d") rows, or a 2-D NumPy array when NumPy is installed;
+    NO_DATA (NaN) marks pixels with no point within max_distance.
+    """
+    index = spatial.GridIndex(dict(enumerate(zip(xs, ys))))
+    neighbours = max(1, min(neighbours, len(index.labels)))
+    side = tile_pixels(grid, len(index.labels), neighbours)
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+        tile_function = _tile_python
+    else:
+        index.xs_array = np.asarray(index.xs)
+        index.ys_array = np.asarray(index.ys)
+        values = np.asarray(values, dtype=np.float64)
+        tile_function = _tile_numpy
+    for row0 in range(0, grid.height, side):
+        row1 = min(row0 + side, grid.height)
+        if np is None:
+            band = [array("d", [NO_DATA]) * grid.width for _ in range(row0, row1)]
+        else:
+            band = np.full((row1 - row0, grid.width), np.nan)
+        for column0 in range(0, grid.width, side):
+            column1 = min(column0 + side, grid.width)
+            candidates = _candidates(index, grid, row0, row1, column0, column1, neighbours, max_distance)
+            if not candidates:
+                continue
+            tile = tile_function(index, values, grid, row0, row1, column0, column1, candidates, neighbours,
+                                 power, max_distance)
+            if np is None:
+                for band_row, tile_row in zip(band, tile):
+                    band_row[column0:column1] = tile_row
+            else:
+                band[:, column0:column1] = tile
+        yield band
+
+
+def _levels(band, scale):
+    # Grey levels: 0 for no data, then 1 (no compound) to 255 (scale or thicker).
+    if hasattr(band, "dtype"):
+        import numpy as np
+        levels = np.zeros(band.shape, dtype=np.uint8)
+        solved = ~np.isnan(band)
+        levels[solved] = 1 + np.rint(np.clip(band[solved] / scale, 0.0, 1.0) * 254)
+        return levels
+    return [bytes(0 if value != value else 1 + round(min(max(value / scale, 0.0), 1.0) * 254) for value in row)
+            for row in band]
+
+
+class PgmWriter:
+    def __init__(self, stream, grid, scale, comment):
+        self.stream = stream
+        self.scale = scale
+        stream.write(f"P5\n# {comment}\n{grid.width} {grid.height}\n255\n".encode())
+
+    def write(self, band):
+        levels = _levels(band, self.scale)
+        self.stream.write(levels.tobytes() if hasattr(levels, "tobytes") else b"".join(levels))
+
+
+class PpmWriter(PgmWriter):
+    def __init__(self, stream, grid, scale, comment):
+        self.stream = stream
+        self.scale = scale
+        self._palette = None
+        stream.write(f"P6\n# {comment}\n{grid.width} {grid.height}\n255\n".encode())
+
+    def write(self, band):
+        levels = _levels(band, self.scale)
+        if hasattr(levels, "dtype"):
+            if self._palette is None:
+                import numpy as np
+                self._palette = np.frombuffer(b"".join(PALETTE), dtype=np.uint8).reshape(256, 3)
+            self.stream.write(self._palette[levels].tobytes())
+        else:
+            for row in levels:
+                self.stream.write(b"".join(map(PALETTE.__getitem__, row)))
+
+
+class CsvWriter:
+    # A header row of pixel-centre x values, then one row per raster row starting with its y;
+    # no-data pixels are left empty.
+    def __init__(self, stream, grid, scale, comment):
+        self.stream = stream
+        self.grid = grid
+        self.row = 0
+        columns = ",".join(repr(round(grid.column_x(column), 6)) for column in range(grid.width))
+        stream.write(f"y\\x,{columns}\n".encode())
+
+    def write(self, band):
+        lines = []
+        for row in band:
+            y = repr(round(self.grid.row_y(self.row), 6))
+            cells = ",".join("" if value != value else f"{value:.2f}" for value in row.tolist())
+            lines.append(f"{y},{cells}\n")
+            self.row += 1
+        self.stream.write("".join(lines).encode())
+
+
+WRITERS = {"pgm": PgmWriter, "ppm": PpmWriter, "csv": CsvWriter}
+
+
+def export_raster(path, xs, ys, values, resolution, fmt=None, neighbours=DEFAULT_NEIGHBOURS, power=DEFAULT_POWER,
+                  max_distance=None, margin=0.0, scale=None):
+    """Write a thickness heat map of the samples to path and return its Grid.
+
+    fmt is "pgm", "ppm" or "csv" (default: from the file extension). Image levels run from
+    0 thickness to scale, which defaults to the largest sample.
+    """
+    if not xs:
+        raise ValueError("No points with x/y coordinates to map.")
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown raster format {fmt!r}; use one of {', '.join(FORMATS)}.")
+    grid = Grid(xs, ys, resolution, margin)
+    if scale is None:
+        scale = max(values)
+    scale = scale if scale > 0 else 1.0
+    comment = (f"left={grid.left!r} top={grid.top!r} resolution={grid.resolution!r} "
+               f"thickness 0-{scale!r} as levels 1-255, 0 = no data")
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        writer = WRITERS[fmt](f, grid, scale, comment)
+        for band in interpolate_bands(xs, ys, values, grid, neighbours, power, max_distance):
+            writer.write(band)
+    os.replace(temporary, path)
+    return grid
+
+
+def main(argv=None):
+    import argparse
+    import core
+    import batch
+    import solver
+    parser = argparse.ArgumentParser(description="Export a thickness heat map of a saved matrix's points.")
+    parser.add_argument("source", help=".mf or .mfb file whose points have x/y coordinates")
+    parser.add_argument("--resolution", type=float, required=True, help="pixel size in distance units")
+    parser.add_argument("--output", help="image or CSV file (default: the source name with the format's extension)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from --output, else ppm")
+    parser.add_argument("--max-slope", type=float, default=core.DEFAULT_MAX_SLOPE,
+                        help=f"max slope in height unit per distance unit (default: {core.DEFAULT_MAX_SLOPE})")
+    parser.add_argument("--neighbours", type=int, default=DEFAULT_NEIGHBOURS,
+                        help=f"nearest points averaged per pixel (default: {DEFAULT_NEIGHBOURS})")
+    parser.add_argument("--power", type=float, default=DEFAULT_POWER,
+                        help=f"inverse-distance weighting power (default: {DEFAULT_POWER})")
+    parser.add_argument("--max-distance", type=float,
+                        help="leave pixels with no point this close empty (default: fill everything)")
+    parser.add_argument("--margin", type=float, default=0.0, help="extra border around the points")
+    parser.add_argument("--scale", type=float, help="thickness shown at full colour (default: the largest)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or (os.path.splitext(args.output)[1].lstrip(".").lower() if args.output else "ppm")
+    output = args.output or f"{os.path.splitext(args.source)[0]}.{fmt}"
+    try:
+        graph = batch.load_and_solve(args.source, args.max_slope, solver.SolveStats())
+        xs, ys, thicknesses = volume.graph_samples(graph)
+        grid = export_raster(output, xs, ys, thicknesses, args.resolution, fmt, args.neighbours, args.power,
+                             args.max_distance, args.margin, args.scale)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {grid.width}x{grid.height} {fmt} map of {len(xs)} points to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
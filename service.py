@@ -0,0 +1,309 @@
+"""Local JSON-over-HTTP leveling service, standard library only.
+
+    python service.py --port 8766
+
+    POST /solve    {"points": {"A": 12.5, "B": 3.1}, "distances": [["A", "B", 60]],
+                    "max_slope": 0.044, "fixed_point": false}
+                -> {"thicknesses": {"A": 0.0, "B": 6.76}, "max_thickness": 6.76}
+    GET  /metrics  request counts, batching counters and latency percentiles
+    GET  /health   {"status": "ok"}
+
+points may also be a list of [label, height] pairs or {"label", "height"} objects, and
+distances a list of {"point1", "point2", "distance"} objects. Points without distances are
+left out of thicknesses, as in solver.solve(). Small requests that arrive together are
+coalesced into one batch, which is solved in a worker process when it is big enough.
+Requests with at least POOL_MIN_EDGES distances go to the process pool on their own.
+"""
+import argparse
+import collections
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import core
+import csr
+import diagnostics
+import solver
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+POOL_MIN_EDGES = 20_000  # requests at least this big are solved in the process pool on their own
+BATCH_WINDOW = 0.002  # seconds to wait for more small requests after the first of a batch
+BATCH_MAX_REQUESTS = 64
+POOL_BATCH_MIN_REQUESTS = 8  # smaller batches are solved on the batching thread
+MAX_BODY_BYTES = 64 * 1024 * 1024
+REQUEST_TIMEOUT = 120.0
+LATENCY_WINDOW = 10_000  # most recent requests the percentiles are computed over
+# Largest accepted height, distance or slope: far beyond any floor, and small enough that the
+# fixed-point engine's micro-units and every thickness stay finite.
+MAX_MAGNITUDE = 1e12
+
+
+def parse_request(body):
+    # JSON body -> (points, distances, max_slope, fixed_point); raises ValueError with a message for the client.
+    try:
+        data = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"body is not valid JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    points = data.get("points")
+    distances = data.get("distances", [])
+    if isinstance(points, dict):
+        points = list(points.items())
+    elif not isinstance(points, list):
+        raise ValueError("points must be an object of label: height or a list of points")
+    if not isinstance(distances, list):
+        raise ValueError("distances must be a list")
+    try:
+        points = [(point["label"], point["height"]) if isinstance(point, dict) else tuple(point) for point in points]
+        distances = [(distance["point1"], distance["point2"], distance["distance"]) if isinstance(distance, dict)
+                     else tuple(distance) for distance in distances]
+        points = [(str(label), float(height)) for label, height in points]
+        distances = [(str(point1), str(point2), float(distance)) for point1, point2, distance in distances]
+        max_slope = float(data.get("max_slope", core.DEFAULT_MAX_SLOPE))
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("points need a label and a numeric height, distances two labels and a numeric distance") from None
+    if not all(_in_range(height) for _, height in points):
+        raise ValueError(f"heights must be finite numbers of at most {MAX_MAGNITUDE:g} in size")
+    if not all(_in_range(distance) for _, _, distance in distances):
+        raise ValueError(f"distances must be finite numbers of at most {MAX_MAGNITUDE:g} in size")
+    if not _in_range(max_slope):
+        raise ValueError(f"max_slope must be a finite number of at most {MAX_MAGNITUDE:g} in size")
+    return points, distances, max_slope, bool(data.get("fixed_point", False))
+
+
+def _in_range(value):
+    return math.isfinite(value) and abs(value) <= MAX_MAGNITUDE
+
+
+def solve_request(request):
+    points, distances, max_slope, fixed_point = request
+    graph = csr.CSRGraph.from_edges(points, distances)
+    solver.solve_graph(graph, max_slope, "fixed" if fixed_point else "auto")
+    thicknesses = graph.thickness_map()
+    return {"thicknesses": thicknesses, "max_thickness": max(thicknesses.values(), default=None)}
+
+
+def solve_batch(requests):
+    # Runs a coalesced batch (possibly in a worker); a failed request does not fail the others.
+    results = []
+    for request in requests:
+        try:
+            results.append(solve_request(request))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.started = time.time()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def observe(self, seconds, status):
+        with self.lock:
+            self.counts["requests"] += 1
+            self.counts[f"status_{status}"] += 1
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            counts = dict(self.counts)
+
+        def percentile(p):
+            # nearest rank
+            return round(1000 * latencies[max(0, -(-p * len(latencies) // 100) - 1)], 3) if latencies else None
+
+        return {"uptime_seconds": round(time.time() - self.started, 1), "counts": counts,
+                "latency_ms": {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99),
+                               "max": round(1000 * latencies[-1], 3) if latencies else None,
+                               "window": len(latencies)}}
+
+
+class SolverService:
+    def __init__(self, workers=None, batch_window=BATCH_WINDOW, log_file=None, log_level="INFO"):
+        import multiprocessing
+        # spawned workers: forking a process that is already running server threads is not safe
+        initializer, initargs = (diagnostics.configure_worker_logging, (log_file, log_level)) if log_file else (None, ())
+        self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=initializer, initargs=initargs)
+        self.batch_window = batch_window
+        self.metrics = Metrics()
+        self.pending = queue.SimpleQueue()
+        self.batcher = threading.Thread(target=self._batch_loop, name="batcher", daemon=True)
+        self.batcher.start()
+
+    def submit(self, request):
+        # Returns a Future of solve_request()'s result.
+        if len(request[1]) >= POOL_MIN_EDGES:
+            self.metrics.count("pooled_requests")
+            return self.pool.submit(solve_request, request)
+        future = Future()
+        self.pending.put((request, future))
+        return future
+
+    def _batch_loop(self):
+        while True:
+            first = self.pending.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < BATCH_MAX_REQUESTS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.pending.put(None)
+                    break
+                batch.append(item)
+            try:
+                self._run_batch(batch)
+            except Exception as e:  # never let one batch stop the thread every later request waits on
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch):
+        self.metrics.count("batches")
+        self.metrics.count("batched_requests", len(batch))
+        requests = [request for request, _ in batch]
+        if len(batch) >= POOL_BATCH_MIN_REQUESTS:
+            self.metrics.count("pooled_batches")
+            self.pool.submit(solve_batch, requests).add_done_callback(lambda done: _settle(batch, done))
+        else:
+            _settle_results(batch, solve_batch(requests))
+
+    def close(self):
+        self.pending.put(None)
+        self.batcher.join()
+        self.pool.shutdown()
+
+
+def _settle(batch, done):
+    try:
+        results = done.result()
+    except Exception as e:  # the worker itself failed
+        results = [e] * len(batch)
+    _settle_results(batch, results)
+
+
+def _settle_results(batch, results):
+    for (_, future), result in zip(batch, results):
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "LevelCalculator/1"
+
+    def do_GET(self):
+        started = time.perf_counter()
+        if self.path == "/metrics":
+            self.reply(200, self.server.service.metrics.snapshot(), started)
+        elif self.path == "/health":
+            self.reply(200, {"status": "ok"}, started)
+        else:
+            self.reply(404, {"error": f"no such endpoint: {self.path}"}, started)
+
+    def do_POST(self):
+        started = time.perf_counter()
+        if self.path != "/solve":
+            self.reply(404, {"error": f"no such endpoint: {self.path}"}, started)
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.reply(400, {"error": "Content-Length must be a whole number of bytes"}, started)
+            return
+        if length > MAX_BODY_BYTES:
+            self.reply(413, {"error": f"body is larger than {MAX_BODY_BYTES} bytes"}, started)
+            return
+        try:
+            request = parse_request(self.rfile.read(length))
+            result = self.server.service.submit(request).result(timeout=REQUEST_TIMEOUT)
+        except ValueError as e:
+            self.reply(400, {"error": str(e)}, started)
+        except TimeoutError:
+            self.reply(504, {"error": f"solve took longer than {REQUEST_TIMEOUT:g}s"}, started)
+        except Exception as e:
+            self.reply(500, {"error": f"solve failed: {e}"}, started)
+        else:
+            self.reply(200, result, started)
+
+    def reply(self, status, payload, started):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.service.metrics.observe(time.perf_counter() - started, status)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # estimating tools fire bursts of requests at once
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, verbose=False, log_file=None, log_level="INFO"):
+    # Port 0 picks a free port; read it back from server.server_address. With log_file, every
+    # solve's INFO record (here and in the worker processes) is appended to that file.
+    if log_file:
+        diagnostics.configure_logging(log_file, log_level)
+    server = ServiceServer((host, port), ServiceHandler)
+    server.service = SolverService(workers, log_file=log_file, log_level=log_level)
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve leveling solves as JSON over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, help="worker processes for large requests (default: one per core)")
+    parser.add_argument("--verbose", action="store_true", help="log every request to standard error")
+    parser.add_argument("--log", metavar="FILE", help="append solve records to this log file (default: no log)")
+    parser.add_argument("--log-level", default=diagnostics.DEFAULT_LOG_LEVEL, help="e.g. DEBUG, INFO, WARNING")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.workers, args.verbose, args.log, args.log_level)
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port} (POST /solve, GET /metrics); Ctrl+C to stop.", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,659 @@
+"""Headless leveling solver: plain data in, thickness map out. No console I/O."""
+import heapq
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Graphs with at least this many stored edge entries go to the NumPy engine when it is installed
+NUMPY_MIN_EDGES = 50_000
+# Components with at least this many points to solve are handed to worker processes
+PARALLEL_MIN_POINTS = 20_000
+# The fixed-point engine works in integer millionths of the height unit
+MICRO_UNITS = 1_000_000
+_PRESENTED_STEP = MICRO_UNITS // 100  # results are presented to 2 decimals, like round(x, 2)
+
+
+class SolveStats:
+    # Counters for one solve. Engines fill in the solve phase; callers can time their own
+    # phases (load, render, ...) on the same object with phase().
+    def __init__(self):
+        self.engine = None
+        self.points = 0
+        self.passes = 0
+        self.relaxations = 0
+        self.updates = 0
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def as_dict(self):
+        return {"engine": self.engine, "points": self.points, "passes": self.passes,
+                "relaxations": self.relaxations, "updates": self.updates,
+                "timings": {name: round(seconds, 6) for name, seconds in self.timings.items()}}
+
+    def __str__(self):
+        timings = ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.timings.items())
+        return (f"engine {self.engine}: {self.points} points, {self.passes} pass(es), "
+                f"{self.relaxations} relaxations, {self.updates} updates ({timings})")
+
+
+def _record(stats, engine, points, relaxations, updates, started):
+    # Fills stats for a finished solve and writes the one INFO record per solve.
+    stats.engine = engine
+    stats.points = points
+    stats.passes += 1
+    stats.relaxations += relaxations
+    stats.updates += updates
+    stats.timings["solve"] = stats.timings.get("solve", 0.0) + time.perf_counter() - started
+    logging = sys.modules.get("logging")
+    if logging is not None:  # not imported by short-lived tools, so they skip its start-up cost
+        logging.getLogger(__name__).info("solve %s", stats)
+
+
+def profile_call(function, *args, limit=25, **kwargs):
+    # Runs function under cProfile; returns (result, report of the top `limit` cumulative entries).
+    import cProfile
+    import io
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args, **kwargs)
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(limit)
+    return result, report.getvalue()
+
+def build_adjacency(points, distances):
+    # points: {label: height}, distances: iterable of (point1, point2, distance).
+    # Edges are stored both ways and the first distance entered wins, like Point.add_reference.
+    adjacency = {label: {} for label in points}
+    for point1, point2, distance in distances:
+        if point1 not in adjacency or point2 not in adjacency:
+            missing = point1 if point1 not in adjacency else point2
+            raise ValueError(f"Distance {point1}-{point2} references unknown point {missing}")
+        distance = float(distance)
+        adjacency[point1].setdefault(point2, distance)
+        adjacency[point2].setdefault(point1, distance)
+    return adjacency
+
+
+def propagate(heights, adjacency, max_slope, on_update=None, stats=None):
+    # Sources are popped highest first. A relaxation reads the source's surveyed
+    # height (never its raised level), so every edge is relaxed exactly once.
+    started = time.perf_counter()
+    updates = relaxations = 0
+    thickness = {}
+    heap = [(-height, label) for label, height in heights.items()]
+    heapq.heapify(heap)
+    while heap:
+        _, label = heapq.heappop(heap)
+        height = heights[label]
+        neighbors = adjacency[label]
+        relaxations += len(neighbors)
+        for neighbor, distance in neighbors.items():
+            current = thickness.setdefault(neighbor, 0.0)
+            target_thickness = round(height - (distance * max_slope) - heights[neighbor], 2)
+            if target_thickness > current:
+                thickness[neighbor] = target_thickness
+                updates += 1
+                if on_update is not None:
+                    on_update(neighbor, target_thickness)
+    _record(stats or SolveStats(), "heap", len(heights), relaxations, updates, started)
+    return thickness
+
+
+def solve(points, distances, max_slope, on_update=None, stats=None):
+    """Return {label: target_thickness} for every point that has at least one distance.
+
+    Points without any distance are left out, matching the 'X' shown in the matrix view.
+    Pass a SolveStats as stats to get the pass/relaxation/update counters and timings back.
+    """
+    points = {label: float(height) for label, height in dict(points).items()}
+    return propagate(points, build_adjacency(points, distances), float(max_slope), on_update, stats)
+
+
+def solve_matrix(matrix, max_slope, on_update=None, stats=None):
+    # Convenience wrapper for a {label: Point} dict as used by the interactive calculator.
+    heights = {label: point.height for label, point in matrix.items()}
+    adjacency = {label: {neighbor: distance.distance for neighbor, distance in point.distances.items()}
+                 for label, point in matrix.items()}
+    return propagate(heights, adjacency, float(max_slope), on_update, stats)
+
+
+class UnionFind:
+    # Disjoint sets of labels, with path halving and union by size.
+    def __init__(self, labels=()):
+        self.parent = {}
+        self.size = {}
+        for label in labels:
+            self.add(label)
+
+    def add(self, label):
+        if label not in self.parent:
+            self.parent[label] = label
+            self.size[label] = 1
+
+    def find(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def union(self, label1, label2):
+        root1, root2 = self.find(label1), self.find(label2)
+        if root1 != root2:
+            if self.size[root1] < self.size[root2]:
+                root1, root2 = root2, root1
+            self.parent[root2] = root1
+            self.size[root1] += self.size.pop(root2)
+        return root1
+
+    def groups(self, labels=None):
+        # {root: [label, ...]} over labels, or over every label
+        groups = {}
+        for label in self.parent if labels is None else labels:
+            groups.setdefault(self.find(label), []).append(label)
+        return groups
+
+
+def to_micro(value):
+    # Height-unit value -> integer micro-units; the only float rounding the fixed-point engine does.
+    return round(value * MICRO_UNITS)
+
+
+def from_micro(micro):
+    # Integer micro-units -> thickness to 2 decimals, rounding half to even with exact integers.
+    quotient, remainder = divmod(micro, _PRESENTED_STEP)
+    if remainder * 2 > _PRESENTED_STEP or (remainder * 2 == _PRESENTED_STEP and quotient % 2):
+        quotient += 1
+    return quotient / 100
+
+
+def recompute_labels(labels, heights, adjacency, max_slope, fixed_point=False):
+    # {label: thickness or None} for just these labels; None means the point has no distances.
+    # heights must cover the labels and their neighbours. Module-level so it can run in a worker.
+    if fixed_point:
+        return _recompute_labels_fixed(labels, heights, adjacency, max_slope)
+    result = {}
+    for label in labels:
+        neighbors = adjacency[label]
+        if not neighbors:
+            result[label] = None
+            continue
+        height = heights[label]
+        best = 0.0
+        for neighbor, distance in neighbors.items():
+            target_thickness = round(heights[neighbor] - (distance * max_slope) - height, 2)
+            if target_thickness > best:
+                best = target_thickness
+        result[label] = best
+    return result
+
+
+def point_thickness(label, heights, adjacency, max_slope, fixed_point=False):
+    # One point's thickness without solving the rest of the floor; None if it has no distances.
+    # A point is only raised by its direct neighbours, so this reads a single adjacency row.
+    return recompute_labels((label,), heights, adjacency, max_slope, fixed_point)[label]
+
+
+def _recompute_labels_fixed(labels, micro_heights, adjacency, max_slope):
+    # recompute_labels() with heights in micro-units: the slope drop of each edge is the only
+    # rounded term, the relaxation itself is exact, and results are rounded once at the end.
+    scaled_slope = max_slope * MICRO_UNITS
+    result = {}
+    for label in labels:
+        neighbors = adjacency[label]
+        if not neighbors:
+            result[label] = None
+            continue
+        height = micro_heights[label]
+        best = 0
+        for neighbor, distance in neighbors.items():
+            target_thickness = micro_heights[neighbor] - round(distance * scaled_slope) - height
+            if target_thickness > best:
+                best = target_thickness
+        result[label] = from_micro(best)
+    return result
+
+
+_forked_graph = None  # (groups, heights, adjacency) inherited by forked workers, so nothing is pickled
+
+
+def _recompute_forked(group, max_slope, fixed_point):
+    groups, heights, adjacency = _forked_graph
+    return recompute_labels(groups[group], heights, adjacency, max_slope, fixed_point)
+
+
+def _component_payload(labels, heights, adjacency):
+    # The slice of the graph a spawned worker needs: the labels' rows and every height they read.
+    rows = {label: adjacency[label] for label in labels}
+    needed = {label: heights[label] for label in labels}
+    for neighbors in rows.values():
+        for neighbor in neighbors:
+            needed[neighbor] = heights[neighbor]
+    return needed, rows
+
+
+def recompute_by_component(groups, heights, adjacency, max_slope, workers=None,
+                           min_parallel_points=PARALLEL_MIN_POINTS, fixed_point=False):
+    """recompute_labels() over groups of labels, one group per connected component.
+
+    Groups of at least min_parallel_points labels run in a process pool when there are two
+    or more of them and more than one worker (default: one per core); the rest are computed
+    here. Workers are forked only when this process has no other threads, otherwise spawned
+    and sent just their slice of the graph. Thicknesses only depend on direct neighbours, so the groups are independent and
+    their results merge as-is.
+    """
+    global _forked_graph
+    groups = list(groups)
+    large = [i for i, labels in enumerate(groups) if len(labels) >= min_parallel_points]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 2 or len(large) < 2:
+        large = []
+    result = {}
+    if large:
+        import multiprocessing
+        import threading
+        from concurrent.futures import ProcessPoolExecutor
+        # Forking shares the graph for free, but is only safe from a single-threaded process: the
+        # TUI's log listener and ingest's to_thread workers could hold a lock the child then needs.
+        fork = threading.active_count() == 1 and "fork" in multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if fork else "spawn")
+        _forked_graph = (groups, heights, adjacency)
+        try:
+            with ProcessPoolExecutor(max_workers=min(len(large), workers), mp_context=context) as pool:
+                if fork:
+                    futures = [pool.submit(_recompute_forked, i, max_slope, fixed_point) for i in large]
+                else:
+                    futures = [pool.submit(recompute_labels, groups[i],
+                                           *_component_payload(groups[i], heights, adjacency), max_slope,
+                                           fixed_point)
+                               for i in large]
+                for labels in groups:
+                    if len(labels) < min_parallel_points:
+                        result.update(recompute_labels(labels, heights, adjacency, max_slope, fixed_point))
+                for future in futures:
+                    result.update(future.result())
+        finally:
+            _forked_graph = None
+    else:
+        for labels in groups:
+            result.update(recompute_labels(labels, heights, adjacency, max_slope, fixed_point))
+    return result
+
+
+def propagate_csr(graph, max_slope, stats=None):
+    # Same relaxation as propagate() over a csr.CSRGraph, written straight into
+    # graph.thicknesses. Edges are stored both ways, so each point pulls from its own
+    # contiguous neighbour slice instead of scattering into other points.
+    heights = graph.heights
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    distances = graph.distances
+    thicknesses = graph.thicknesses
+    max_slope = float(max_slope)
+    started = time.perf_counter()
+    updates = 0
+    start = offsets[0]
+    for i in range(len(heights)):
+        end = offsets[i + 1]
+        if start == end:
+            thicknesses[i] = float("nan")
+            continue
+        height = heights[i]
+        best = 0.0
+        for slot in range(start, end):
+            target_thickness = round(heights[neighbors[slot]] - (distances[slot] * max_slope) - height, 2)
+            if target_thickness > best:
+                best = target_thickness
+                updates += 1
+        thicknesses[i] = best
+        start = end
+    _record(stats or SolveStats(), "csr", len(heights), offsets[-1] - offsets[0], updates, started)
+    return graph
+
+
+def propagate_fixed(graph, max_slope, stats=None):
+    # propagate_csr() in integer micro-units: heights and slope drops are scaled once, every
+    # relaxation is exact integer arithmetic, and only the stored result is rounded.
+    heights = [to_micro(height) for height in graph.heights]
+    offsets = graph.offsets
+    neighbors = graph.neighbors
+    distances = graph.distances
+    thicknesses = graph.thicknesses
+    scaled_slope = float(max_slope) * MICRO_UNITS
+    started = time.perf_counter()
+    updates = 0
+    start = offsets[0]
+    for i in range(len(heights)):
+        end = offsets[i + 1]
+        if start == end:
+            thicknesses[i] = float("nan")
+            continue
+        height = heights[i]
+        best = 0
+        for slot in range(start, end):
+            target_thickness = heights[neighbors[slot]] - round(distances[slot] * scaled_slope) - height
+            if target_thickness > best:
+                best = target_thickness
+                updates += 1
+        thicknesses[i] = from_micro(best)
+        start = end
+    _record(stats or SolveStats(), "fixed", len(heights), offsets[-1] - offsets[0], updates, started)
+    return graph
+
+
+def propagate_numpy(graph, max_slope, stats=None):
+    # Vectorised propagate_csr(): every edge is relaxed in one batch and the per-point
+    # maximum is a segmented max over the CSR slices (neighbour slices are contiguous, so
+    # the scatter-max is a reduceat). Sources are surveyed heights, so one batch is the
+    # fixed point. np.round can differ from round() only on exact half-cent ties.
+    import numpy as np
+
+    started = time.perf_counter()
+    updates = 0
+    heights = np.frombuffer(graph.heights, dtype=np.float64)
+    offsets = np.frombuffer(graph.offsets, dtype=np.int64)
+    neighbors = np.frombuffer(graph.neighbors, dtype=np.int64)
+    distances = np.frombuffer(graph.distances, dtype=np.float64)
+    thicknesses = np.full(len(heights), np.nan)
+    degrees = np.diff(offsets)
+    has_edges = degrees > 0
+    if has_edges.any():
+        targets = np.repeat(np.arange(len(heights)), degrees)
+        relaxed = heights[neighbors] - (distances * float(max_slope)) - heights[targets]
+        best = np.round(np.maximum.reduceat(relaxed, offsets[:-1][has_edges] - offsets[0]), 2)
+        thicknesses[has_edges] = np.where(best > 0.0, best, 0.0)
+        updates = int(np.count_nonzero(best > 0.0))
+    np.frombuffer(graph.thicknesses, dtype=np.float64)[:] = thicknesses
+    _record(stats or SolveStats(), "numpy", len(heights), len(neighbors), updates, started)
+    return graph
+
+
+def numpy_available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def solve_graph(graph, max_slope, engine="auto", stats=None):
+    # Solves a csr.CSRGraph in place. engine is "python", "numpy", "fixed" or "auto"; auto
+    # picks NumPy for graphs with at least NUMPY_MIN_EDGES edge entries when it is installed.
+    if engine == "auto":
+        engine = "numpy" if len(graph.neighbors) >= NUMPY_MIN_EDGES and numpy_available() else "python"
+    if engine == "numpy":
+        return propagate_numpy(graph, max_slope, stats)
+    if engine == "python":
+        return propagate_csr(graph, max_slope, stats)
+    if engine == "fixed":
+        return propagate_fixed(graph, max_slope, stats)
+    raise ValueError(f"Unknown solver engine: {engine}")
+
+
+# The NumPy sweep evaluates slopes in blocks of at most this many slope x edge cells
+SWEEP_BLOCK_CELLS = 4_000_000
+
+
+def _sweep_edges(heights, adjacency):
+    # Directed edges that can raise their target for some slope >= 0: the source is higher.
+    # Each carries the largest slope at which it still pushes thickness above zero.
+    edges = []
+    for target, neighbors in adjacency.items():
+        target_height = heights[target]
+        for source, distance in neighbors.items():
+            source_height = heights[source]
+            if source_height > target_height:
+                limit = (source_height - target_height) / distance if distance > 0 else float("inf")
+                edges.append((limit, source_height, distance, target_height, target))
+    edges.sort(key=lambda edge: edge[0], reverse=True)
+    return edges
+
+
+def sweep_max_slope(heights, adjacency, slopes, keep_thicknesses=False):
+    """Solve the same graph for many max_slope values in one batch.
+
+    Returns one row per slope, in the order given: {"max_slope", "max_thickness",
+    "total_thickness"} plus "thicknesses" ({label: thickness}) when keep_thicknesses is set.
+    Rows match solve() at each slope; large sweeps run on NumPy when it is installed and,
+    like propagate_numpy(), can then differ by 0.01 on exact half-cent ties.
+    """
+    slopes = [float(slope) for slope in slopes]
+    touched = [label for label, neighbors in adjacency.items() if neighbors]
+    edges = _sweep_edges(heights, adjacency)
+    if len(edges) * len(slopes) >= SWEEP_BLOCK_CELLS // 4 and numpy_available() and not keep_thicknesses:
+        totals = _sweep_numpy(edges, sorted(set(slopes)))
+    else:
+        totals = _sweep_python(edges, sorted(set(slopes), reverse=True), keep_thicknesses)
+    rows = []
+    for slope in slopes:
+        best_max, total, best = totals[slope]
+        row = {"max_slope": slope, "max_thickness": max(best_max, 0.0) if touched else None,
+               "total_thickness": round(total, 2)}
+        if keep_thicknesses:
+            row["thicknesses"] = {label: best.get(label, 0.0) for label in touched}
+        rows.append(row)
+    return rows
+
+
+def _sweep_python(edges, slopes, keep_thicknesses):
+    # edges are sorted by limit, so for each slope only the prefix with limit > slope can
+    # contribute; anything past it relaxes to <= 0 and would leave the 0.0 floor unchanged.
+    totals = {}
+    for slope in slopes:
+        best = {}
+        for limit, source_height, distance, target_height, target in edges:
+            if limit <= slope:
+                break
+            target_thickness = round(source_height - (distance * slope) - target_height, 2)
+            if target_thickness > best.get(target, 0.0):
+                best[target] = target_thickness
+        totals[slope] = (max(best.values(), default=0.0), sum(best.values()), best if keep_thicknesses else None)
+    return totals
+
+
+def _sweep_numpy(edges, slopes):
+    # Relaxes every (slope, edge) pair in blocks of slopes, then takes per-target maxima
+    # with a segmented max over edges grouped by target.
+    import numpy as np
+
+    totals = {slope: (0.0, 0.0, None) for slope in slopes}
+    if not edges:
+        return totals
+    edges = sorted(edges, key=lambda edge: edge[4])
+    source_heights = np.array([edge[1] for edge in edges])
+    distances = np.array([edge[2] for edge in edges])
+    target_heights = np.array([edge[3] for edge in edges])
+    targets = [edge[4] for edge in edges]
+    starts = np.array([i for i in range(len(targets)) if i == 0 or targets[i] != targets[i - 1]])
+    block = max(1, SWEEP_BLOCK_CELLS // len(edges))
+    for first in range(0, len(slopes), block):
+        chunk = np.array(slopes[first:first + block])
+        relaxed = np.round(source_heights[None, :] - (distances[None, :] * chunk[:, None]) - target_heights[None, :], 2)
+        best = np.maximum(np.maximum.reduceat(relaxed, starts, axis=1), 0.0)
+        for slope, row_max, row_total in zip(chunk.tolist(), best.max(axis=1).tolist(), best.sum(axis=1).tolist()):
+            totals[slope] = (row_max, row_total, None)
+    return totals
+
+
+class IncrementalSolver:
+    # Keeps the last solution and re-propagates only what an edit can reach. A point's
+    # thickness depends on its own height and on its direct neighbours, so an edit dirties
+    # the touched point(s) and their neighbourhood; solve() recomputes just those labels,
+    # so components without edits are skipped entirely.
+    def __init__(self, max_slope, fixed_point=False):
+        self.heights = {}
+        self.adjacency = {}
+        self.thicknesses = {}
+        self.dirty = set()
+        self._max_slope = float(max_slope)
+        self._fixed_point = bool(fixed_point)
+        self._micro_heights = {}  # heights as to_micro() values, for the fixed-point mode
+        self._components = None  # UnionFind, built on demand and dropped when an edge is removed
+        self.revision = 0  # bumped by every edit, so callers can tell whether the graph changed
+
+    @property
+    def max_slope(self):
+        return self._max_slope
+
+    @max_slope.setter
+    def max_slope(self, value):
+        value = float(value)
+        if value != self._max_slope:
+            self._max_slope = value
+            self.dirty.update(self.heights)
+
+    @property
+    def fixed_point(self):
+        # Solve in exact integer micro-units (see propagate_fixed) instead of rounded floats
+        return self._fixed_point
+
+    @fixed_point.setter
+    def fixed_point(self, value):
+        value = bool(value)
+        if value != self._fixed_point:
+            self._fixed_point = value
+            self.dirty.update(self.heights)
+
+    def clear(self):
+        self.heights.clear()
+        self._micro_heights.clear()
+        self.adjacency.clear()
+        self.thicknesses.clear()
+        self.dirty.clear()
+        self._components = None
+        self.revision += 1
+
+    def load_matrix(self, matrix):
+        self.clear()
+        for label, point in matrix.items():
+            self.set_point(label, point.height)
+        for label, point in matrix.items():
+            for neighbor, distance in point.distances.items():
+                self.set_distance(label, neighbor, distance.distance)
+
+    def set_point(self, label, height):
+        height = float(height)
+        if label in self.heights:
+            if self.heights[label] == height:
+                return
+            self.dirty.update(self.adjacency[label])
+        else:
+            self.adjacency[label] = {}
+            if self._components is not None:
+                self._components.add(label)
+        self.heights[label] = height
+        self._micro_heights[label] = to_micro(height)
+        self.dirty.add(label)
+        self.revision += 1
+
+    def remove_point(self, label):
+        if label not in self.heights:
+            return
+        for neighbor in self.adjacency.pop(label):
+            del self.adjacency[neighbor][label]
+            self.dirty.add(neighbor)
+        del self.heights[label]
+        del self._micro_heights[label]
+        self.dirty.discard(label)
+        self.thicknesses.pop(label, None)
+        self._components = None
+        self.revision += 1
+
+    def set_distance(self, point1, point2, distance):
+        if point1 not in self.heights or point2 not in self.heights:
+            missing = point1 if point1 not in self.heights else point2
+            raise ValueError(f"Distance {point1}-{point2} references unknown point {missing}")
+        if point1 == point2:
+            raise ValueError(f"Distance {point1}-{point2} must join two different points")
+        distance = float(distance)
+        if self.adjacency[point1].get(point2) == distance:
+            return
+        self.adjacency[point1][point2] = distance
+        self.adjacency[point2][point1] = distance
+        self.dirty.update((point1, point2))
+        self.revision += 1
+        if self._components is not None:
+            self._components.union(point1, point2)
+
+    def remove_distance(self, point1, point2):
+        if point2 in self.adjacency.get(point1, {}):
+            del self.adjacency[point1][point2]
+            del self.adjacency[point2][point1]
+            self.dirty.update((point1, point2))
+            self._components = None
+            self.revision += 1
+
+    def adopt(self, thicknesses, on_update=None):
+        # Takes a full solution computed elsewhere (e.g. a cached one for exactly this graph)
+        # instead of solving; returns the changed labels like solve().
+        changed = {}
+        for label in self.thicknesses.keys() - thicknesses.keys():
+            changed[label] = None
+        for label, target_thickness in thicknesses.items():
+            if self.thicknesses.get(label) != target_thickness:
+                changed[label] = target_thickness
+                if on_update is not None:
+                    on_update(label, target_thickness)
+        self.thicknesses = dict(thicknesses)
+        self.dirty.clear()
+        return changed
+
+    def components(self):
+        # UnionFind over the current points and distances
+        if self._components is None:
+            self._components = UnionFind(self.heights)
+            for label, neighbors in self.adjacency.items():
+                for neighbor in neighbors:
+                    self._components.union(label, neighbor)
+        return self._components
+
+    def thickness_at(self, label):
+        # One point's thickness, current even with edits pending, without solving anything else.
+        if label not in self.dirty:
+            return self.thicknesses.get(label)
+        heights = self._micro_heights if self._fixed_point else self.heights
+        return point_thickness(label, heights, self.adjacency, self._max_slope, self._fixed_point)
+
+    def solve(self, on_update=None, stats=None, workers=1):
+        """Re-propagate the dirty region; returns {label: thickness or None} for changed labels.
+
+        Afterwards self.thicknesses holds the full solution, identical to solve() on the same data.
+        With workers above 1, large dirty regions are split by connected component and big
+        components are recomputed in worker processes (see recompute_by_component). Grouping
+        costs about half a one-process solve, so it only pays off for several large rooms on
+        spare cores; by default everything is computed in-process.
+        """
+        started = time.perf_counter()
+        relaxations = sum(len(self.adjacency[label]) for label in self.dirty)
+        heights = self._micro_heights if self._fixed_point else self.heights
+        if workers > 1 and len(self.dirty) >= 2 * PARALLEL_MIN_POINTS:
+            groups = self.components().groups(self.dirty).values()
+            solved = recompute_by_component(groups, heights, self.adjacency, self._max_slope, workers,
+                                            fixed_point=self._fixed_point)
+        else:
+            solved = recompute_labels(self.dirty, heights, self.adjacency, self._max_slope, self._fixed_point)
+        changed = {}
+        for label, target_thickness in solved.items():
+            if target_thickness == self.thicknesses.get(label):
+                continue
+            if target_thickness is None:
+                del self.thicknesses[label]
+            else:
+                self.thicknesses[label] = target_thickness
+                if on_update is not None:
+                    on_update(label, target_thickness)
+            changed[label] = target_thickness
+        self.dirty.clear()
+        engine = "incremental-fixed" if self._fixed_point else "incremental"
+        _record(stats or SolveStats(), engine, len(self.heights), relaxations, len(changed), started)
+        return changed
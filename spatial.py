@@ -0,0 +1,94 @@
+"""Uniform-grid spatial index and neighbour-edge generation for points with x/y coordinates."""
+import math
+
+
+class GridIndex:
+    # Buckets points into square cells sized so each cell holds about `per_cell` points.
+    # Radius and k-nearest queries only look at the cells that can contain an answer.
+    def __init__(self, coordinates, per_cell: float = 2.0):
+        # coordinates: {label: (x, y)}
+        self.labels = list(coordinates)
+        self.xs = [float(coordinates[label][0]) for label in self.labels]
+        self.ys = [float(coordinates[label][1]) for label in self.labels]
+        count = len(self.labels)
+        if count:
+            width = max(self.xs) - min(self.xs)
+            depth = max(self.ys) - min(self.ys)
+            area = width * depth
+            if area > 0:
+                self.cell_size = math.sqrt(area * per_cell / count)
+            else:
+                self.cell_size = max(width, depth) / count or 1.0
+        else:
+            self.cell_size = 1.0
+        self.cells = {}
+        for i in range(count):
+            self.cells.setdefault(self._cell(self.xs[i], self.ys[i]), []).append(i)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def within(self, x, y, radius):
+        # Yields (id, distance) for every point within radius of (x, y).
+        cx0, cy0 = self._cell(x - radius, y - radius)
+        cx1, cy1 = self._cell(x + radius, y + radius)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for i in self.cells.get((cx, cy), ()):
+                    distance = math.hypot(self.xs[i] - x, self.ys[i] - y)
+                    if distance <= radius:
+                        yield i, distance
+
+    def nearest(self, x, y, k, exclude=None):
+        # Returns up to k (distance, id) pairs, closest first, searching rings of cells
+        # outward until the k-th candidate is closer than any unvisited cell.
+        k = min(k, len(self.labels) - (exclude is not None))
+        if k <= 0:
+            return []
+        cx, cy = self._cell(x, y)
+        found = []
+        ring = 0
+        while True:
+            for cell in _ring_cells(cx, cy, ring):
+                for i in self.cells.get(cell, ()):
+                    if i != exclude:
+                        found.append((math.hypot(self.xs[i] - x, self.ys[i] - y), i))
+            found.sort()
+            del found[k:]
+            if len(found) == k and found[-1][0] <= ring * self.cell_size:
+                return found
+            ring += 1
+
+
+def _ring_cells(cx, cy, ring):
+    if ring == 0:
+        yield (cx, cy)
+        return
+    for dx in range(-ring, ring + 1):
+        yield (cx + dx, cy - ring)
+        yield (cx + dx, cy + ring)
+    for dy in range(-ring + 1, ring):
+        yield (cx - ring, cy + dy)
+        yield (cx + ring, cy + dy)
+
+
+def knn_edges(coordinates, k: int = 4, index=None):
+    # Yields (point1, point2, distance) joining every point to its k nearest neighbours.
+    # Each undirected edge is produced once.
+    index = index or GridIndex(coordinates)
+    seen = set()
+    for i, label in enumerate(index.labels):
+        for distance, j in index.nearest(index.xs[i], index.ys[i], k, exclude=i):
+            key = (i, j) if i < j else (j, i)
+            if key not in seen:
+                seen.add(key)
+                yield label, index.labels[j], distance
+
+
+def radius_edges(coordinates, radius: float, index=None):
+    # Yields (point1, point2, distance) for every pair of points at most radius apart.
+    index = index or GridIndex(coordinates)
+    for i, label in enumerate(index.labels):
+        for j, distance in index.within(index.xs[i], index.ys[i], radius):
+            if j > i:
+                yield label, index.labels[j], distance
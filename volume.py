@@ -0,0 +1,228 @@
+"""Compound volume estimate from coordinate-bearing points.
+
+Points are triangulated (Delaunay) in plan view and target_thickness is interpolated linearly
+over each triangle, so a triangle contributes area * mean(vertex thicknesses). The whole
+triangulation is built up front, so memory grows with the number of points; only the
+integration runs in fixed-size chunks, vectorised with NumPy when it is installed.
+
+    python volume.py saves/scan.mfb --height-unit mm --distance-unit m
+"""
+import sys
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# Lengths in meters, used to turn height_unit * distance_unit^2 into litres
+UNIT_LENGTHS = {
+    "millimeter": 0.001, "millimeters": 0.001, "mm": 0.001,
+    "centimeter": 0.01, "centimeters": 0.01, "cm": 0.01,
+    "meter": 1.0, "meters": 1.0, "m": 1.0,
+    "inch": 0.0254, "inches": 0.0254, "in": 0.0254,
+    "foot": 0.3048, "feet": 0.3048, "ft": 0.3048,
+}
+
+
+def to_litres(volume, height_unit, distance_unit):
+    # Returns None when either unit is not one we know how to convert.
+    height = UNIT_LENGTHS.get(str(height_unit).lower())
+    distance = UNIT_LENGTHS.get(str(distance_unit).lower())
+    if height is None or distance is None:
+        return None
+    return volume * height * distance * distance * 1000.0
+
+
+def triangulate(xs, ys):
+    # Returns the Delaunay triangles as (i, j, k) index triples. SciPy's Qhull is used when
+    # available; the pure-Python fallback is fine for hand-entered surveys but not for scans.
+    if len(xs) < 3:
+        return []
+    try:
+        from scipy.spatial import Delaunay, QhullError
+    except ImportError:
+        return _sweep_delaunay(xs, ys)
+    import numpy as np
+    try:
+        return Delaunay(np.column_stack((xs, ys))).simplices
+    except QhullError:
+        return []  # all points collinear or coincident
+
+
+def _orientation(xs, ys, a, b, c):
+    return (xs[b] - xs[a]) * (ys[c] - ys[a]) - (ys[b] - ys[a]) * (xs[c] - xs[a])
+
+
+def _in_circumcircle(xs, ys, a, b, c, d):
+    # True when d lies strictly inside the circumcircle of the counter-clockwise triangle abc.
+    adx, ady = xs[a] - xs[d], ys[a] - ys[d]
+    bdx, bdy = xs[b] - xs[d], ys[b] - ys[d]
+    cdx, cdy = xs[c] - xs[d], ys[c] - ys[d]
+    ad, bd, cd = adx * adx + ady * ady, bdx * bdx + bdy * bdy, cdx * cdx + cdy * cdy
+    det = (adx * (bdy * cd - bd * cdy) - ady * (bdx * cd - bd * cdx) + ad * (bdx * cdy - bdy * cdx))
+    return det > 1e-12 * ad * bd  # tolerance keeps cocircular quads (grids) from flipping forever
+
+
+def _sweep_delaunay(xs, ys):
+    # Sweep in x order keeping the lower and upper hull chains (monotone chain); each hull
+    # edge a new point can see becomes a triangle. That covers the convex hull exactly, and
+    # Lawson edge flips then turn the sweep triangulation into a Delaunay one.
+    order = sorted(range(len(xs)), key=lambda i: (xs[i], ys[i]))
+    order = [i for n, i in enumerate(order) if n == 0 or (xs[i], ys[i]) != (xs[order[n - 1]], ys[order[n - 1]])]
+    triangles = []
+    lower, upper = [], []
+    for p in order:
+        while len(lower) >= 2 and _orientation(xs, ys, lower[-2], lower[-1], p) < 0:
+            triangles.append([lower[-2], p, lower[-1]])
+            lower.pop()
+        while len(upper) >= 2 and _orientation(xs, ys, upper[-2], upper[-1], p) > 0:
+            triangles.append([upper[-2], upper[-1], p])
+            upper.pop()
+        lower.append(p)
+        upper.append(p)
+
+    edges = {}
+    for t, triangle in enumerate(triangles):
+        for k in range(3):
+            a, b = triangle[k], triangle[(k + 1) % 3]
+            edges.setdefault((min(a, b), max(a, b)), []).append(t)
+    stack = [edge for edge, owners in edges.items() if len(owners) == 2]
+    while stack:
+        edge = stack.pop()
+        owners = edges.get(edge)
+        if owners is None or len(owners) != 2:
+            continue
+        a, b = edge
+        t1, t2 = owners
+        c = sum(triangles[t1]) - a - b
+        d = sum(triangles[t2]) - a - b
+        x, y, z = triangles[t1]
+        if not _in_circumcircle(xs, ys, x, y, z, d):
+            continue
+        side_a, side_b = _orientation(xs, ys, c, d, a), _orientation(xs, ys, c, d, b)
+        if side_a * side_b >= 0:
+            continue  # quad is not strictly convex, the flipped diagonal would leave it
+        del edges[edge]
+        triangles[t1] = [c, d, a] if side_a > 0 else [d, c, a]
+        triangles[t2] = [c, d, b] if side_b > 0 else [d, c, b]
+        edges[(min(c, d), max(c, d))] = [t1, t2]
+        # bc moved from t1 to t2 and ad from t2 to t1; ac and bd keep their owner
+        owners = edges[(min(b, c), max(b, c))]
+        owners[owners.index(t1)] = t2
+        owners = edges[(min(a, d), max(a, d))]
+        owners[owners.index(t2)] = t1
+        for other in (a, b):
+            for end in (c, d):
+                key = (min(other, end), max(other, end))
+                if len(edges[key]) == 2:
+                    stack.append(key)
+    return [tuple(triangle) for triangle in triangles]
+
+
+def triangle_chunks(triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+    for start in range(0, len(triangles), chunk_size):
+        yield triangles[start:start + chunk_size]
+
+
+def _integrate_chunk_python(xs, ys, thicknesses, chunk):
+    volume = area = 0.0
+    for a, b, c in chunk:
+        triangle_area = abs((xs[b] - xs[a]) * (ys[c] - ys[a]) - (xs[c] - xs[a]) * (ys[b] - ys[a])) / 2.0
+        volume += triangle_area * (thicknesses[a] + thicknesses[b] + thicknesses[c]) / 3.0
+        area += triangle_area
+    return volume, area
+
+
+def _integrate_chunk_numpy(xs, ys, thicknesses, chunk):
+    import numpy as np
+    chunk = np.asarray(chunk)
+    a, b, c = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+    areas = np.abs((xs[b] - xs[a]) * (ys[c] - ys[a]) - (xs[c] - xs[a]) * (ys[b] - ys[a])) / 2.0
+    means = (thicknesses[a] + thicknesses[b] + thicknesses[c]) / 3.0
+    return float(areas @ means), float(areas.sum())
+
+
+def compound_volume(xs, ys, thicknesses, triangles=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return (volume, area, triangle_count) for thicknesses sampled at (xs[i], ys[i]).
+
+    Volume is in height_unit * distance_unit^2 and area in distance_unit^2.
+    """
+    if triangles is None:
+        triangles = triangulate(xs, ys)
+    try:
+        import numpy as np
+    except ImportError:
+        integrate = _integrate_chunk_python
+    else:
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        thicknesses = np.asarray(thicknesses, dtype=np.float64)
+        integrate = _integrate_chunk_numpy
+    volume = area = 0.0
+    for chunk in triangle_chunks(triangles, chunk_size):
+        chunk_volume, chunk_area = integrate(xs, ys, thicknesses, chunk)
+        volume += chunk_volume
+        area += chunk_area
+    return volume, area, len(triangles)
+
+
+def matrix_samples(matrix):
+    # (xs, ys, thicknesses) for the points of a {label: Point} dict that have coordinates.
+    # Points without a computed thickness ('X') have no distance constraints and count as 0.
+    xs, ys, thicknesses = [], [], []
+    for point in matrix.values():
+        if point.x is None or point.y is None:
+            continue
+        xs.append(point.x)
+        ys.append(point.y)
+        thicknesses.append(0.0 if point.target_thickness == 'X' else point.target_thickness)
+    return xs, ys, thicknesses
+
+
+def graph_samples(graph):
+    # The same for a solved csr.CSRGraph, without building Point objects.
+    xs, ys, thicknesses = [], [], []
+    if graph.xs is None or graph.ys is None:
+        return xs, ys, thicknesses
+    for x, y, thickness in zip(graph.xs, graph.ys, graph.thicknesses):
+        if x == x and y == y:
+            xs.append(x)
+            ys.append(y)
+            thicknesses.append(thickness if thickness == thickness else 0.0)
+    return xs, ys, thicknesses
+
+
+def matrix_volume(matrix, chunk_size=DEFAULT_CHUNK_SIZE):
+    return compound_volume(*matrix_samples(matrix), chunk_size=chunk_size)
+
+
+def graph_volume(graph, chunk_size=DEFAULT_CHUNK_SIZE):
+    return compound_volume(*graph_samples(graph), chunk_size=chunk_size)
+
+
+def main(argv=None):
+    import argparse
+    import batch
+    import core
+    import solver
+    parser = argparse.ArgumentParser(description="Estimate the compound volume of a saved matrix's points.")
+    parser.add_argument("source", help=".mf or .mfb file whose points have x/y coordinates")
+    parser.add_argument("--max-slope", type=float, default=core.DEFAULT_MAX_SLOPE,
+                        help=f"max slope in height unit per distance unit (default: {core.DEFAULT_MAX_SLOPE})")
+    parser.add_argument("--height-unit", default="", help="e.g. mm; with --distance-unit, also prints litres")
+    parser.add_argument("--distance-unit", default="", help="e.g. m")
+    args = parser.parse_args(argv)
+
+    try:
+        graph = batch.load_and_solve(args.source, args.max_slope, solver.SolveStats())
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    compound, area, triangles = graph_volume(graph)
+    print(f"Triangles: {triangles}")
+    print(f"Covered area: {area:.2f}")
+    print(f"Compound volume: {compound:.2f}")
+    litres = to_litres(compound, args.height_unit, args.distance_unit)
+    if litres is not None:
+        print(f"Compound volume: {litres:.2f} litres")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())